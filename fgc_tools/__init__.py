@@ -1,4 +1,22 @@
 """FGC Creator"""
-from .fgccreator import FGCCreator
-from .fgcreader import FGCReader
-from .readresult import ReadResult
\ No newline at end of file
+import importlib
+
+# The classes are imported when they are used first, so e.g. the client does not have to import OpenCV
+CLASS_MODULES = {
+    "FGCCreator": ".fgccreator",
+    "FGCReader": ".fgcreader",
+    "ReadResult": ".readresult",
+    "FGCBatchReader": ".fgcbatchreader",
+    "FGCAsyncReader": ".fgcasyncreader",
+    "FGCServer": ".fgcserver",
+    "FGCClient": ".fgcclient",
+    "FGCSharedMemoryReader": ".fgcsharedreader",
+}
+
+__all__ = list(CLASS_MODULES)
+
+
+def __getattr__(name):
+    if name in CLASS_MODULES:
+        return getattr(importlib.import_module(CLASS_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,5 @@
+from .fgcbatchreader import FGCBatchReader
+
+
+# Read many images from the command line with "python -m fgc_tools"
+FGCBatchReader.main()
@@ -34,3 +34,46 @@ def show_image(unique_name, image, title=None):
     plt.imshow(plt_image)
     plt.show(block=False)
 
+
+def render_overlay(img, overlays):
+    """Draws the detected geometry of the overlays (see FGCReader.create_overlay) on a copy of the image."""
+    if len(img.shape) == 2:
+        output_img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    else:
+        output_img = img.copy()
+
+    # All contours first, so they do not cover the fgcs
+    for overlay in overlays:
+        region_img = get_overlay_region(output_img, overlay)
+        cv2.drawContours(region_img, overlay["contours"], -1, (0,0,255), 1)
+
+    for overlay in overlays:
+        region_img = get_overlay_region(output_img, overlay)
+        if overlay["center_coordinates"] is None:
+            continue
+        cv2.circle(region_img, (overlay["center_coordinates"][0], overlay["center_coordinates"][1]), 4, (255,255,255), 2)
+
+        for target_position in overlay["target_positions"]:
+            cv2.drawMarker(region_img, (target_position[0], target_position[1]), (0,255,0), cv2.MARKER_TILTED_CROSS, 5, 1)
+
+        for ring_id, ring_contours in enumerate(overlay["ring_contours"]):
+            outline_color = (255,255,0)
+            if ring_id % 2:
+                outline_color = (0,255,255)
+            if ring_id > 1:
+                cv2.drawContours(region_img, ring_contours, -1, outline_color, 1)
+
+        # Draw outline of center and orientation ring
+        cv2.drawContours(region_img, [overlay["center_circle"]], 0, (0, 255, 0), 2)
+        if overlay["orientation_dot"] is not None:
+            cv2.drawContours(region_img, [overlay["orientation_dot"]], 0, (255, 0, 0), 2)
+        cv2.drawContours(region_img, [overlay["orientation_ring"]], 0, (0, 200, 0), 2)
+    return output_img
+
+
+def get_overlay_region(output_img, overlay):
+    """Returns the part of the output image the geometry of the overlay was found in."""
+    if overlay["region"] is None:
+        return output_img
+    x_start, y_start, x_end, y_end = overlay["region"]
+    return output_img[y_start:y_end, x_start:x_end]
@@ -1,7 +1,15 @@
 import cv2
 import math
+import time
+import logging
 import numpy as np
 from .libs.commonfunctions import CommonFunctions
+from .libs.commonconstants import CommonConstants
+from .libs.hamming import *
+
+
+logger = logging.getLogger(__name__)
+
 
 def image_resize(image, width = None, height = None, inter = cv2.INTER_AREA):
     dim = None
@@ -17,7 +25,48 @@ def image_resize(image, width = None, height = None, inter = cv2.INTER_AREA):
     resized = cv2.resize(image, dim, interpolation = inter)
     return resized
 
-def find_circle_positions_with_hough_transform(img, features) -> bool:
+
+def to_gray(img):
+    """Convert a BGR or BGRA image to gray, gray images are returned as they are."""
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the time budget of a read is used up. Stage is the pipeline stage that was running."""
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded while {stage}.")
+        self.stage = stage
+
+
+def check_deadline(deadline, stage) -> None:
+    """Raise DeadlineExceeded if the deadline (a time.time() timestamp) has passed. A deadline of None never passes."""
+    if deadline is not None and time.time() > deadline:
+        raise DeadlineExceeded(stage)
+
+
+class ReadCancelled(Exception):
+    """Raised when a read is cancelled before it is finished. Stage is the pipeline stage that would have run next."""
+    def __init__(self, stage):
+        super().__init__(f"Read cancelled before {stage}.")
+        self.stage = stage
+
+
+def check_stage(features, stage) -> None:
+    """Checks if the next stage may run. Raises ReadCancelled if the cancel event of the features is set
+    and DeadlineExceeded if their deadline has passed."""
+    cancel_event = features.get("cancel_event")
+    if cancel_event is not None and cancel_event.is_set():
+        raise ReadCancelled(stage)
+    check_deadline(features["deadline"], stage)
+
+
+def find_circle_positions_with_hough_transform(img, features, max_circles=1) -> bool:
+    """Find the positions of round elements with the hough transform.
+    Only the strongest circle is used by default, images with more than one fgc need max_circles=None (all circles)."""
     # Hough transform parameters
     minDist = 10
     param1 = 80
@@ -29,35 +78,201 @@ def find_circle_positions_with_hough_transform(img, features) -> bool:
     features["hough_circles"] = circles
     circle_positions = []
     if circles is not None:
-        for circle in circles:
-            circle = circle[0]
+        for circle in circles[0][:max_circles]:
             x = int(circle[0])
             y = int(circle[1])
             circle_positions.append((x,y))
 
         features["hough_circle_positions"] = circle_positions
-        print(f"Found {len(circle_positions)} hough circle{'' if len(circle_positions) == 1 else 's'}.")
+        logger.debug(f"Found {len(circle_positions)} hough circle{'' if len(circle_positions) == 1 else 's'}.")
         return True
     return False
 
 
+def check_fgc_presence(img, max_pixels=400_000) -> bool:
+    """Cheap check on a small copy of the image (about max_pixels pixels) if it could contain an fgc at all.
+    Returns False for frames that clearly contain no fgc: flat frames, frames without edges and frames without the center structure of an fgc.
+    The fgc has to be large enough for its center dot and orientation ring to stay apart on the small copy (about 120 pixels wide, a quarter of the shorter edge of larger frames)."""
+    height, width = img.shape[:2]
+    scale = min(1.0, math.sqrt(max_pixels / (width * height)))
+    if scale < 0.5:
+        # Drop most pixels first, area interpolation of the full frame costs more than the whole check
+        img = cv2.resize(img, (int(width * scale * 2), int(height * scale * 2)), interpolation=cv2.INTER_NEAREST)
+    # Only one channel has to be interpolated after converting to gray
+    small_img = cv2.resize(to_gray(img), (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+    # An fgc is printed with strong contrast
+    if small_img.std() < 12:
+        logger.debug("Presence check: image is flat.")
+        return False
+
+    # An fgc consists of a lot of small elements and therefore edges
+    edged = cv2.Canny(small_img, 55, 200)
+    if np.count_nonzero(edged) < edged.size * 0.003:
+        logger.debug("Presence check: image has too few edges.")
+        return False
+
+    if not find_center_structure(edged):
+        logger.debug("Presence check: image has no fgc center.")
+        return False
+    return True
+
+
+def find_center_structure(edged, min_sectors=21, sectors=24) -> bool:
+    """Looks for the center structure of an fgc in an edge image: a round dot inside a concentric ring (the orientation ring)
+    with edges in at least min_sectors of sectors directions at the distance of the first data ring, which goes all the way around."""
+    contours, _hierarchy = cv2.findContours(edged, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return False
+    rects = np.array([cv2.boundingRect(contour) for contour in contours], dtype=np.float64)
+    areas = np.array([cv2.contourArea(contour) for contour in contours])
+    xs = rects[:, 0] + rects[:, 2] / 2
+    ys = rects[:, 1] + rects[:, 3] / 2
+    radii = np.maximum(rects[:, 2], rects[:, 3]) / 2
+    aspect_ratios = np.minimum(rects[:, 2], rects[:, 3]) / np.maximum(1, np.maximum(rects[:, 2], rects[:, 3]))
+
+    # Closed round contours filling most of their bounding circle can be the center dot
+    round_contours = (radii >= 2) & (aspect_ratios > 0.75)
+    dots = np.flatnonzero(round_contours & (areas > 0.6 * np.pi * radii ** 2))
+    for dot in dots:
+        # The edges of the orientation ring are round, concentric to the dot and about 1.25 to 1.75 times as large
+        distances = np.hypot(xs - xs[dot], ys - ys[dot])
+        size_ratios = radii / radii[dot]
+        rings = np.flatnonzero(round_contours & (size_ratios >= 1.15) & (size_ratios <= 3) & (distances < 0.3 * radii))
+        if len(rings) == 0:
+            continue
+
+        # The first data ring lies at one and a half times the distance of the orientation ring, right outside of its edges
+        ring_radius = radii[rings].max()
+        x_start, y_start = max(0, int(xs[dot] - ring_radius * 1.6)), max(0, int(ys[dot] - ring_radius * 1.6))
+        edge_y, edge_x = np.nonzero(edged[y_start:int(ys[dot] + ring_radius * 1.6) + 1, x_start:int(xs[dot] + ring_radius * 1.6) + 1])
+        edge_x = edge_x + (x_start - xs[dot])
+        edge_y = edge_y + (y_start - ys[dot])
+        edge_distances = np.hypot(edge_x, edge_y)
+        around = (edge_distances > ring_radius * 1.1) & (edge_distances < ring_radius * 1.6)
+        angles = np.arctan2(edge_y[around], edge_x[around])
+        covered_sectors = np.unique(((angles + np.pi) / (2 * np.pi) * sectors).astype(np.int64) % sectors)
+        if len(covered_sectors) >= min_sectors:
+            return True
+    return False
+
+
 def calculate_distance(point1, point2) -> bool:
     """Calculate distance of points."""
     distance = math.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
     return distance
 
 def get_color_for_contour(img, contour):
-    # Gets called A LOT -> make it more efficient
-    mask = np.zeros(img.shape[:2], dtype=np.uint8)
-    mask = cv2.drawContours(mask, [contour], -1, 255, -1)
-    col_mean = cv2.mean(img,mask)
-    return (col_mean[0] + col_mean[1] + col_mean[2]) // 3
-
-def find_center_with_contours(img_edged, img_original, output_img, features) -> bool:
+    # Only the bounding rect of the contour is masked, the pixels are the same as for a mask of the full image
+    x, y, w, h = cv2.boundingRect(contour)
+    mask = np.zeros((h, w), dtype=np.uint8)
+    mask = cv2.drawContours(mask, [contour], -1, 255, -1, offset=(-x, -y))
+    col_mean = cv2.mean(img[y:y+h, x:x+w], mask)
+    # Average the color channels (not the alpha channel), gray images only have one
+    channels = 1 if img.ndim == 2 else min(img.shape[2], 3)
+    return sum(col_mean[:channels]) // channels
+
+def get_colors_for_contours(img, contours):
+    """Get the mean colors of all contours, each one masked only within its own bounding rect (see get_color_for_contour).
+    Contours of the fgc overlap (inner and outer edge of a stroke), so a shared label image would lose pixels of the inner contours."""
+    return [get_color_for_contour(img, contour) for contour in contours]
+
+def find_enclosed_center_candidates(possible_fgc_elements, hierarchy=None, deadline=None):
+    """Find pairs of possible fgc elements where the first element lies inside the second one.
+    The center dot always lies inside the orientation ring, so only these pairs have to be scored.
+    Children of an element in the contour hierarchy are enclosed by it. The orientation ring is an open arc though, so the center dot
+    usually is its sibling in the hierarchy. Therefore elements are also put into a grid by their center and every element looks
+    for elements inside its enclosing circle in the grid cells that circle covers."""
+    enclosing_circles = [cv2.minEnclosingCircle(element["contour"]) for element in possible_fgc_elements]
+    if not enclosing_circles:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    cell_size = max(1.0, float(np.median([radius for _center, radius in enclosing_circles])) * 2)
+
+    grid = {}
+    for index, element in enumerate(possible_fgc_elements):
+        grid.setdefault((int(element["x"] // cell_size), int(element["y"] // cell_size)), []).append(index)
+
+    pairs = set()
+
+    # Walk up the hierarchy from every element to find the elements containing it
+    if hierarchy is not None:
+        element_by_contour_index = {element["contour_index"]: index for index, element in enumerate(possible_fgc_elements)}
+        for a, element in enumerate(possible_fgc_elements):
+            parent_index = hierarchy[0][element["contour_index"]][3]
+            while parent_index != -1:
+                if parent_index in element_by_contour_index:
+                    pairs.add((a, element_by_contour_index[parent_index]))
+                parent_index = hierarchy[0][parent_index][3]
+
+    for b, ((circle_x, circle_y), radius) in enumerate(enclosing_circles):
+        check_deadline(deadline, "finding center")
+        for cell_x in range(int((circle_x - radius) // cell_size), int((circle_x + radius) // cell_size) + 1):
+            for cell_y in range(int((circle_y - radius) // cell_size), int((circle_y + radius) // cell_size) + 1):
+                for a in grid.get((cell_x, cell_y), []):
+                    if a != b and calculate_distance((possible_fgc_elements[a]["x"], possible_fgc_elements[a]["y"]), (circle_x, circle_y)) <= radius:
+                        pairs.add((a, b))
+
+    # Keep the row-major order of the all pairs search, so ties are resolved the same way
+    pairs = sorted(pairs)
+    pair_a = np.array([a for a, _b in pairs], dtype=np.int64)
+    pair_b = np.array([b for _a, b in pairs], dtype=np.int64)
+    return pair_a, pair_b
+
+
+def score_center_candidates(possible_fgc_elements, hough_circle_positions, pair_a=None, pair_b=None, max_chunk_size=4_000_000, deadline=None):
+    """Score ordered pairs of possible fgc elements as center candidates at once (lower is better).
+    All pairs are scored unless candidate pairs are given. Pairs are only considered if the second element is clearly bigger than the first one.
+    Returns the scores and the element indices, offsets and hough circle distances of all considered pairs in row-major order."""
+    xs = np.array([element["x"] for element in possible_fgc_elements], dtype=np.int64)
+    ys = np.array([element["y"] for element in possible_fgc_elements], dtype=np.int64)
+    sizes = np.array([element["bounding_rect_size"] for element in possible_fgc_elements], dtype=np.float64)
+    sides = np.array([element["sides"] for element in possible_fgc_elements], dtype=np.int64)
+    colors = np.array([element["color"] for element in possible_fgc_elements], dtype=np.float64)
+
+    # Do not consider elements themself or combinations, where a > b
+    if pair_a is None or pair_b is None:
+        valid_pairs = ~(
+            (sizes[:, None] + sizes[:, None]/4 >= sizes[None, :]) | (sizes[:, None]/4 >= sizes[None, :])
+        )
+        np.fill_diagonal(valid_pairs, False)
+        pair_a, pair_b = np.nonzero(valid_pairs)
+    else:
+        valid_pairs = (pair_a != pair_b) & ~(
+            (sizes[pair_a] + sizes[pair_a]/4 >= sizes[pair_b]) | (sizes[pair_a]/4 >= sizes[pair_b])
+        )
+        pair_a, pair_b = pair_a[valid_pairs], pair_b[valid_pairs]
+
+    pair_offsets = np.sqrt((xs[pair_a] - xs[pair_b])**2 + (ys[pair_a] - ys[pair_b])**2)
+
+    # Find minimum distance of the average center of both contours to a hough circle (in chunks to limit memory)
+    hough_xs = np.array([position[0] for position in hough_circle_positions], dtype=np.float64)
+    hough_ys = np.array([position[1] for position in hough_circle_positions], dtype=np.float64)
+    average_xs = (xs[pair_a] + xs[pair_b])/2
+    average_ys = (ys[pair_a] + ys[pair_b])/2
+    closeness_to_hough_circles = np.empty(len(pair_a), dtype=np.float64)
+    chunk_size = max(1, max_chunk_size // max(1, len(hough_xs)))
+    for chunk_start in range(0, len(pair_a), chunk_size):
+        check_deadline(deadline, "finding center")
+        chunk = slice(chunk_start, chunk_start + chunk_size)
+        squared_distances = (hough_xs[None, :] - average_xs[chunk, None])**2 + (hough_ys[None, :] - average_ys[chunk, None])**2
+        closeness_to_hough_circles[chunk] = np.sqrt(squared_distances.min(axis=1))
+
+    # relation_big_small_score = abs(bounding_rect_size_small - (bounding_rect_size_big * 0.75))
+    pair_offset_score = pair_offsets * 10
+    size_score = (1 / (sizes[pair_a] + sizes[pair_a])) * 200000
+    closeness_to_hough_circle_score = closeness_to_hough_circles * 10
+    side_score = (sides[pair_a] + sides[pair_b]) / 10
+    color_score = (colors[pair_a] + colors[pair_b]) * 10
+    scores = pair_offset_score + closeness_to_hough_circle_score + side_score + color_score + size_score
+    return scores, pair_a, pair_b, pair_offsets, closeness_to_hough_circles
+
+
+def find_center_with_contours(img_edged, img_original, features, candidate_count=1) -> bool:
     """Funky function to determine the center of the fgc.
-    It tries to find a point in the image, where two overlapping contours are as close as possible to a hough transform found circle."""
+    It tries to find a point in the image, where two overlapping contours are as close as possible to a hough transform found circle.
+    The best candidate_count centers at distinct positions are stored in score order in features["center_candidates"]."""
 
-    contours, _ = cv2.findContours(
+    contours, hierarchy = cv2.findContours(
         img_edged, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE
     )
 
@@ -67,8 +282,9 @@ def find_center_with_contours(img_edged, img_original, output_img, features) ->
     rejected_too_many_sides_cnt = 0
     rejected_too_small_cnt = 0
 
-    for contour in contours[1:]:
-        cv2.drawContours(output_img, [contour], 0, (0,0,255), 1)
+    for contour_index, contour in enumerate(contours[1:], start=1):
+        if contour_index % 1000 == 0:
+            check_deadline(features.get("deadline"), "finding center")
         approx = cv2.approxPolyDP(contour, 0.01 * cv2.arcLength(contour, True), True)
         
         # finding center point of shape
@@ -86,13 +302,8 @@ def find_center_with_contours(img_edged, img_original, output_img, features) ->
 
         # Only consider elements with a certain amount of contour sides and a minimum size.
         if contour_sides >= 5 and contour_sides <= 35 and bounding_rect_size >= 20 and x and y:
-            box = cv2.boxPoints(bounding_rect)
-            box = np.int0(box)
-            
-            color = get_color_for_contour(img_original, contour)
-
             possible_fgc_elements.append(
-                {"contour": contour, "x": x, "y": y, "bounding_rect": bounding_rect, "bounding_rect_size": bounding_rect_size, "sides": contour_sides, "color": color}
+                {"contour": contour, "contour_index": contour_index, "x": x, "y": y, "bounding_rect": bounding_rect, "bounding_rect_size": bounding_rect_size, "sides": contour_sides}
             )
         else:
             if contour_sides < 5:
@@ -102,68 +313,80 @@ def find_center_with_contours(img_edged, img_original, output_img, features) ->
             elif bounding_rect_size < 20:
                 rejected_too_small_cnt += 1
 
-    print(f"Rejected {rejected_too_few_sides_cnt + rejected_too_many_sides_cnt + rejected_too_small_cnt} of {len(contours[1:])} contours.")
-    print(f"Too few sides:  {rejected_too_few_sides_cnt} contours.")
-    print(f"Too many sides: {rejected_too_many_sides_cnt} contours.")
-    print(f"Too small:      {rejected_too_small_cnt} contours.")
-
-    # Store possible fgc elements in features
-    features["possible_fgc_elements"] = possible_fgc_elements
+    logger.debug(f"Rejected {rejected_too_few_sides_cnt + rejected_too_many_sides_cnt + rejected_too_small_cnt} of {len(contours[1:])} contours.")
+    logger.debug(f"Too few sides:  {rejected_too_few_sides_cnt} contours.")
+    logger.debug(f"Too many sides: {rejected_too_many_sides_cnt} contours.")
+    logger.debug(f"Too small:      {rejected_too_small_cnt} contours.")
 
-    # Store contour pairs with their distance to each other and to the next hough transform circle in a list
-    circle_pairs_with_offset_and_closeness_to_hough_circle = []
-    for a, contour_dict_1 in enumerate(possible_fgc_elements):
-        for b, contour_dict_2 in enumerate(possible_fgc_elements):
-            # Get bounding rect sizes
-            bounding_rect_size_a = contour_dict_1["bounding_rect_size"]
-            bounding_rect_size_b = contour_dict_2["bounding_rect_size"]
+    # Measure the colors of all possible fgc elements at once
+    colors = get_colors_for_contours(img_original, [element["contour"] for element in possible_fgc_elements])
+    for element, color in zip(possible_fgc_elements, colors):
+        element["color"] = color
 
-            # Do not consider elements themself or combinations, where a > b
-            if a == b or (bounding_rect_size_a + bounding_rect_size_a/4 >= bounding_rect_size_b) or (bounding_rect_size_a/4 >= bounding_rect_size_b):
-                continue
+    # Store all contours and the possible fgc elements in features
+    features["contours"] = contours
+    features["possible_fgc_elements"] = possible_fgc_elements
 
-            pair_offset = calculate_distance([contour_dict_1["x"], contour_dict_1["y"]],[contour_dict_2["x"], contour_dict_2["y"]])
-
-            # Calculate the average center of both contours 
-            average_circle_center = ((contour_dict_1["x"] + contour_dict_2["x"])/2, (contour_dict_1["y"] + contour_dict_2["y"])/2)
-
-            # Find minimum distance to a hough circle
-            min_closeness_to_hough_circle = None
-            for circle_position in features["hough_circle_positions"]:
-                closeness_to_hough_circle = calculate_distance(circle_position, average_circle_center)
-                if min_closeness_to_hough_circle is None or closeness_to_hough_circle < min_closeness_to_hough_circle:
-                    min_closeness_to_hough_circle = closeness_to_hough_circle
-
-            # Store the found pair
-            circle_pairs_with_offset_and_closeness_to_hough_circle.append({
-                "x": int(average_circle_center[0]),
-                "y": int(average_circle_center[1]),
-                "bounding_rect_size_small": bounding_rect_size_a,
-                "bounding_rect_size_big": bounding_rect_size_a,
-                "total_sides": contour_dict_1["sides"] + contour_dict_2["sides"],
-                "total_color": contour_dict_1["color"] + contour_dict_2["color"],
-                "pair_offset": pair_offset,
-                "closeness_to_hough_circle": min_closeness_to_hough_circle,
-                "shape_a": contour_dict_1["contour"],
-                "shape_b": contour_dict_2["contour"],
-                "center_a": (contour_dict_1["x"], contour_dict_1["y"]),
-                "center_b": (contour_dict_2["x"], contour_dict_2["y"]),
-            })
-
-    # Now we can determine the best match for our fgc center
+    # Score the contour pairs where one contour encloses the other with their distance to each other and to the next hough transform circle
     center_of_fgc = None
-    best_score = None
-    for circle_pair in circle_pairs_with_offset_and_closeness_to_hough_circle:
-        # relation_big_small_score = abs(circle_pair["bounding_rect_size_small"] - (circle_pair["bounding_rect_size_big"] * 0.75))
-        pair_offset_score = circle_pair["pair_offset"] * 10
-        size_score = (1 / (circle_pair["bounding_rect_size_small"] + circle_pair["bounding_rect_size_big"])) * 200000
-        closeness_to_hough_circle_score = circle_pair["closeness_to_hough_circle"] * 10
-        side_score = circle_pair["total_sides"] / 10
-        color_score = circle_pair["total_color"] * 10
-        score = pair_offset_score + closeness_to_hough_circle_score + side_score + color_score + size_score
-        if best_score is None or score < best_score:
-            best_score = score
-            center_of_fgc = circle_pair
+    pair_a, pair_b = find_enclosed_center_candidates(possible_fgc_elements, hierarchy, deadline=features.get("deadline"))
+    scores, pair_a, pair_b, pair_offsets, closeness_to_hough_circles = score_center_candidates(
+        possible_fgc_elements, features["hough_circle_positions"], pair_a, pair_b, deadline=features.get("deadline")
+    )
+    logger.debug(f"Scored {len(scores)} enclosed contour pairs.")
+    if len(scores) == 0:
+        # Fall back to scoring all contour pairs
+        scores, pair_a, pair_b, pair_offsets, closeness_to_hough_circles = score_center_candidates(
+            possible_fgc_elements, features["hough_circle_positions"], deadline=features.get("deadline")
+        )
+
+    # Now we can determine the best match for our fgc center (first pair with the lowest score)
+    # and the next best pairs somewhere else as alternatives (the edges of one center dot lie within its size of each other)
+    center_candidates = []
+    if len(scores) > 0:
+        candidate_pairs = [int(np.argmin(scores))]
+        if candidate_count > 1:
+            candidate_pairs = []
+            for pair in np.argsort(scores, kind="stable"):
+                element = possible_fgc_elements[pair_a[pair]]
+                if all(
+                    calculate_distance((element["x"], element["y"]), (possible_fgc_elements[pair_a[candidate_pair]]["x"], possible_fgc_elements[pair_a[candidate_pair]]["y"]))
+                    > math.sqrt(possible_fgc_elements[pair_a[candidate_pair]]["bounding_rect_size"])
+                    for candidate_pair in candidate_pairs
+                ):
+                    candidate_pairs.append(int(pair))
+                    if len(candidate_pairs) == candidate_count:
+                        break
+        center_candidates = [
+            {
+                "center_coordinates": (possible_fgc_elements[pair_a[pair]]["x"], possible_fgc_elements[pair_a[pair]]["y"]),
+                "center_circle": possible_fgc_elements[pair_a[pair]]["contour"],
+                "orientation_ring": possible_fgc_elements[pair_b[pair]]["contour"],
+                "score": float(scores[pair]),
+            }
+            for pair in candidate_pairs
+        ]
+        best_pair = candidate_pairs[0]
+        contour_dict_1 = possible_fgc_elements[pair_a[best_pair]]
+        contour_dict_2 = possible_fgc_elements[pair_b[best_pair]]
+        center_of_fgc = {
+            "x": int((contour_dict_1["x"] + contour_dict_2["x"])/2),
+            "y": int((contour_dict_1["y"] + contour_dict_2["y"])/2),
+            "bounding_rect_size_small": contour_dict_1["bounding_rect_size"],
+            "bounding_rect_size_big": contour_dict_1["bounding_rect_size"],
+            "total_sides": contour_dict_1["sides"] + contour_dict_2["sides"],
+            "total_color": contour_dict_1["color"] + contour_dict_2["color"],
+            "pair_offset": float(pair_offsets[best_pair]),
+            "closeness_to_hough_circle": float(closeness_to_hough_circles[best_pair]),
+            "shape_a": contour_dict_1["contour"],
+            "shape_b": contour_dict_2["contour"],
+            "center_a": (contour_dict_1["x"], contour_dict_1["y"]),
+            "center_b": (contour_dict_2["x"], contour_dict_2["y"]),
+        }
+
+    if center_of_fgc is None:
+        logger.debug("Found no contour pairs for the center.")
+        return False
 
     #  Print all scores of winning center
     pair_offset_score = center_of_fgc["pair_offset"]
@@ -172,26 +395,23 @@ def find_center_with_contours(img_edged, img_original, output_img, features) ->
     side_score = center_of_fgc["total_sides"] / 10
     color_score = center_of_fgc["total_color"] * 20
     score = pair_offset_score + closeness_to_hough_circle_score + side_score + color_score + size_score
-    print("Best pair scores:")
-    print("pair_offset_score:", pair_offset_score)
-    print("size_score:", size_score)
-    print("closeness_to_hough_circle_score", closeness_to_hough_circle_score)
-    print("side_score:", side_score)
-    print("color_score:", color_score)
-    print("total_score:", score)
-
-    # If a center is found
-    if center_of_fgc is not None:
-        true_center = center_of_fgc["center_a"]
-        center_shape = center_of_fgc["shape_a"]
-        orientation_shape = center_of_fgc["shape_b"]
-        
-        # Store the center to the features
-        features["center_circle"] = center_shape
-        features["orientation_ring"] = orientation_shape
-        features["center_coordinates"] = true_center
-        return True
-    return False
+    logger.debug("Best pair scores:")
+    logger.debug("pair_offset_score: %s", pair_offset_score)
+    logger.debug("size_score: %s", size_score)
+    logger.debug("closeness_to_hough_circle_score %s", closeness_to_hough_circle_score)
+    logger.debug("side_score: %s", side_score)
+    logger.debug("color_score: %s", color_score)
+    logger.debug("total_score: %s", score)
+
+    # Store the center to the features
+    true_center = center_of_fgc["center_a"]
+    center_shape = center_of_fgc["shape_a"]
+    orientation_shape = center_of_fgc["shape_b"]
+    features["center_circle"] = center_shape
+    features["orientation_ring"] = orientation_shape
+    features["center_coordinates"] = true_center
+    features["center_candidates"] = center_candidates
+    return True
 
 
 def find_orientation_dot(features) -> None:
@@ -213,7 +433,7 @@ def find_orientation_dot(features) -> None:
     possible_orientation_dot_index = 2
     while (possible_orientation_dot_area >= center_circle_area):
         possible_orientation_dot_index += 1
-        print("Removing possible_orientation_dot_area.")
+        logger.debug("Removing possible_orientation_dot_area.")
         if len(features["possible_fgc_elements"]) > 2:
             possible_orientation_dot = features["possible_fgc_elements"][possible_orientation_dot_index]
             _x,_y,w,h = cv2.boundingRect(possible_orientation_dot["contour"])
@@ -226,97 +446,134 @@ def find_orientation_dot(features) -> None:
 def sanitize_data(features) -> None:
     """Try to get rid of all contours outside of the fgc by setting a max jump distance between contour distances to the center."""
 
-    print("Sanitizing data...")
+    logger.debug("Sanitizing data...")
 
-    # Add furthest_distance_to_center entry to all contours
-    for element in features["possible_fgc_elements"]:
-        furthest_distance_to_center = 0
-        for point in element["contour"]:
+    elements = features["possible_fgc_elements"]
 
-            point_distance = calculate_distance(features["center_coordinates"], point[0]) 
-            if point_distance > furthest_distance_to_center:
-                furthest_distance_to_center = point_distance
-        element["furthest_distance_to_center"] = furthest_distance_to_center
+    # Add furthest_distance_to_center entry to all contours (max distance of all points per contour at once)
+    contour_lengths = np.array([len(element["contour"]) for element in elements])
+    all_points = np.concatenate([element["contour"][:, 0, :] for element in elements]).astype(np.int64)
+    point_distances = np.sqrt(
+        (all_points[:, 0] - features["center_coordinates"][0])**2 + (all_points[:, 1] - features["center_coordinates"][1])**2
+    )
+    furthest_distances = np.maximum.reduceat(point_distances, np.concatenate(([0], np.cumsum(contour_lengths)[:-1])))
+    for element, furthest_distance_to_center in zip(elements, furthest_distances):
+        element["furthest_distance_to_center"] = float(furthest_distance_to_center)
 
     # Sort contours by furthest_distance_to_center
-    features["possible_fgc_elements"] = sorted(features["possible_fgc_elements"], key=lambda elem: elem["furthest_distance_to_center"])
+    order = np.argsort(furthest_distances, kind="stable")
+    sorted_distances = furthest_distances[order]
 
-    # Remove all contours which are too far from the previous contour
+    # Remove all contours which are too far from the previous contour (every contour after the first jump is too far as well)
     max_jump_distance = features["orientation_dot"]["distance_to_center"] * 0.5
-    last_distance = features["possible_fgc_elements"][1]["furthest_distance_to_center"]
-    index = 2
-    while index < len(features["possible_fgc_elements"]):
-        element = features["possible_fgc_elements"][index]
-        if element["furthest_distance_to_center"] - last_distance > max_jump_distance:
-            features["possible_fgc_elements"].pop(index)
-        else:
-            last_distance = element["furthest_distance_to_center"]
-            element["index"] = index
-            index += 1
+    jumps = np.flatnonzero(np.diff(sorted_distances[1:]) > max_jump_distance)
+    kept_count = jumps[0] + 2 if len(jumps) > 0 else len(order)
+
+    features["possible_fgc_elements"] = [elements[element_index] for element_index in order[:kept_count]]
+    for index in range(2, kept_count):
+        features["possible_fgc_elements"][index]["index"] = index
 
 def get_all_angles(features) -> None:
     """Get angles of all shapes regarding to the orientation dot."""
 
-    vector_from_center_to_orientation_point = [
+    elements = features["possible_fgc_elements"]
+    if not elements:
+        return
+
+    vector_from_center_to_orientation_point = np.array([
         features["orientation_dot"]["x"] - features["center_coordinates"][0],
         features["orientation_dot"]["y"] - features["center_coordinates"][1],
-    ]
-
-    for element in features["possible_fgc_elements"]:
-        vector_from_center_to_element = [
-            element["x"] - features["center_coordinates"][0],
-            element["y"] - features["center_coordinates"][1],
-        ]
-
-        unit_vector_1 = vector_from_center_to_orientation_point / np.linalg.norm(vector_from_center_to_orientation_point)
-        unit_vector_2 = vector_from_center_to_element / np.linalg.norm(vector_from_center_to_element)
-        dot_product = np.dot(unit_vector_1, unit_vector_2)
-        clipped_dot_product = np.clip(dot_product, -1.0, 1.0)
-        rad = np.arccos(clipped_dot_product)
-        if vector_from_center_to_orientation_point[0] * vector_from_center_to_element[1] - vector_from_center_to_orientation_point[1] * vector_from_center_to_element[0] < 0:
-            rad = -rad
-        deg = 0
-        if not math.isnan(rad):
-            deg = math.degrees(rad)
-            deg = math.floor(deg+0.5)
-            if deg < 0:
-                deg = 180 + (180 - abs(deg))
-            if deg >= 359:
-                deg = 0
-
-        element["angle"] = deg
-
-
-def divide_elements_into_rings_by_angle_and_distance(features):
-    current_ring = 0
-    current_distance = 0
-    rings = []
-    angle_sorted_rings = []
-
-    # Divide elements into rings by furthest_distance_to_center
-    for element in features["possible_fgc_elements"]:
-
-        # Increase ring if there is a jump in distance to center
-        if abs(current_distance - element["furthest_distance_to_center"]) >= features["orientation_dot"]["distance_to_center"] * 0.1:   # WAS 0.2
-            current_ring += 1
-        
-        # Append new ring to rings if necessary and append current contour element
-        if current_ring >= len(rings):
-            rings.append([])
-        
-        # Current ring append contour
-        rings[current_ring - 1].append(element)
-
-        # Set current distance to own maximum distance
-        current_distance = element["furthest_distance_to_center"]
-
-    # Get number of dots for each contour
-    for ring in rings:
-        if len(ring) < 1: continue
-        sorted_ring = sorted(ring, key=lambda elem: elem["angle"])
-        angle_sorted_rings.append(sorted_ring)
-
-    features["rings"] = angle_sorted_rings
+    ], dtype=np.float64)
+    vectors_from_center_to_elements = np.array(
+        [[element["x"], element["y"]] for element in elements], dtype=np.float64
+    ) - np.array(features["center_coordinates"], dtype=np.float64)
+
+    # Signed angle between the orientation vector and all element vectors at once
+    cross_products = vector_from_center_to_orientation_point[0] * vectors_from_center_to_elements[:, 1] - vector_from_center_to_orientation_point[1] * vectors_from_center_to_elements[:, 0]
+    dot_products = vectors_from_center_to_elements @ vector_from_center_to_orientation_point
+    degs = np.floor(np.degrees(np.arctan2(cross_products, dot_products)) + 0.5)
+    degs[degs < 0] += 360
+    degs[degs >= 359] = 0
+
+    for element, deg in zip(elements, degs):
+        element["angle"] = int(deg)
+
+
+def divide_elements_into_rings_by_predicted_radii(features):
+    """Assign all elements to the ring with the nearest predicted radius at once and sort them by ring and angle.
+    By specification the outer edge of ring n (0 = center circle, 1 = orientation ring) lies at (n + 4/3) ring distances from the center,
+    where the ring distance is half the distance to the orientation dot. The ring distance is refined by fitting it to the assigned elements."""
+    elements = features["possible_fgc_elements"]
+    if not elements:
+        features["rings"] = []
+        return
+
+    distances = np.array([element["furthest_distance_to_center"] for element in elements], dtype=np.float64)
+    angles = np.array([element["angle"] for element in elements])
+    ring_offset = (CommonConstants.STROKE_WIDTH * 2) / CommonConstants.CIRCLE_DISTANCE
+    ring_distance = features["orientation_dot"]["distance_to_center"] / 2
+
+    # Nearest predicted ring radius for all elements, then fit the ring distance to the assignment (least squares through the origin)
+    for _iteration in range(3):
+        ring_ids = np.maximum(0, np.round(distances / ring_distance - ring_offset)).astype(np.int64)
+        predicted_units = ring_ids + ring_offset
+        ring_distance = float(np.dot(distances, predicted_units) / np.dot(predicted_units, predicted_units))
+    ring_ids = np.maximum(0, np.round(distances / ring_distance - ring_offset)).astype(np.int64)
+
+    # Sort by ring, then by angle
+    order = np.lexsort((angles, ring_ids))
+    rings = [[] for _ in range(int(ring_ids.max()) + 1)]
+    for element_index in order:
+        rings[ring_ids[element_index]].append(elements[element_index])
+
+    features["rings"] = rings
+
+
+def vote_data_bits(bit_streams) -> list:
+    """Combine the data bits read from the same fgc several times by per-bit majority vote.
+    Streams of a different length than the most common one misread the ring structure and only vote on the bits they share with it.
+    Ties are decided by the first stream of the most common length."""
+    bit_streams = [bit_stream for bit_stream in bit_streams if len(bit_stream) > 0]
+    if not bit_streams:
+        return []
+    lengths = [len(bit_stream) for bit_stream in bit_streams]
+    # Most common length, the longer one on a tie
+    length = max(set(lengths), key=lambda candidate: (lengths.count(candidate), candidate))
+    tie_breaker = np.array(bit_streams[lengths.index(length)], dtype=np.int64)
+
+    votes = np.zeros(length, dtype=np.int64)
+    voters = np.zeros(length, dtype=np.int64)
+    for bit_stream in bit_streams:
+        shared_length = min(length, len(bit_stream))
+        votes[:shared_length] += np.array(bit_stream[:shared_length], dtype=np.int64)
+        voters[:shared_length] += 1
+    voted_bits = np.where(votes * 2 == voters, tie_breaker, votes * 2 > voters)
+    return [int(bit) for bit in voted_bits]
+
+
+def validate_data_bits(data, check_text=True, max_trailing_bits=3) -> bool:
+    """Check if the data bits read from the rings are a valid hamming code word.
+    The last ring can end with a few extra bits, so the code word may be shorter than the data by up to max_trailing_bits.
+    A code word is valid if its syndrome is zero (after correcting at most one bit) and it holds the version and whole bytes.
+    The hamming code alone accepts a lot of random bits, so with check_text the bytes additionally have to be valid utf-8."""
+    for trailing_bits in range(0, min(max_trailing_bits, len(data) - 1) + 1):
+        code_word = list(data[:len(data) - trailing_bits])
+        if (len(code_word) - len(parity_index(code_word)) - 4) % 8 != 0:
+            continue
+        error_index = find_error(code_word)
+        if len(error_index) != 0:
+            code_word = correct_error(code_word, error_index)
+            if len(find_error(code_word)) != 0:
+                continue
+        if not check_text:
+            return True
+        text_bits = "".join(str(bit) for bit in remove_parity(code_word)[4:])
+        try:
+            bytes(int(text_bits[i:i+8], 2) for i in range(0, len(text_bits), 8)).decode("utf-8")
+        except UnicodeDecodeError:
+            continue
+        return True
+    return False
 
 
 def rotate_vector(v,deg):
@@ -331,20 +588,118 @@ def rotate_vector(v,deg):
     return M.dot(v)
 
 
+def get_angle_bucket(point, center_coordinates) -> int:
+    """Get the one degree wide angular bucket a point lies in, seen from the fgc center."""
+    angle = math.degrees(math.atan2(point[1] - center_coordinates[1], point[0] - center_coordinates[0]))
+    return int(math.floor(angle)) % 360
+
+
+def index_ring_elements_by_angle(ring, center_coordinates) -> list:
+    """Index the elements of a ring by the one degree wide angular buckets their contour spans.
+    Every contour edge covers the shorter arc between the angles of its end points, so a point inside a contour
+    always lies in one of the buckets of that contour. The ring order of the elements is kept in every bucket."""
+    buckets = [[] for _ in range(360)]
+    for element in ring:
+        points = element["contour"][:, 0, :].astype(np.float64)
+        angles = np.degrees(np.arctan2(points[:, 1] - center_coordinates[1], points[:, 0] - center_coordinates[0])) % 360
+        next_angles = np.roll(angles, -1)
+        signed_spans = (next_angles - angles + 540) % 360 - 180
+        starts = np.where(signed_spans >= 0, angles, next_angles)
+
+        # Mark all buckets covered by the edges (one bucket margin on both sides against rounding issues)
+        first_buckets = np.floor(starts).astype(int) - 1
+        last_buckets = np.floor(starts + np.abs(signed_spans)).astype(int) + 1
+        bucket_counts = last_buckets - first_buckets + 1
+        offsets = np.arange(bucket_counts.max())
+        covered_buckets = first_buckets[:, None] + offsets[None, :]
+        covered = np.zeros(360, dtype=bool)
+        covered[covered_buckets[offsets[None, :] < bucket_counts[:, None]] % 360] = True
+
+        for bucket in np.flatnonzero(covered):
+            buckets[bucket].append(element)
+    return buckets
+
+
+def build_ring_distance_map(features) -> dict:
+    """Build a distance map to the contour points of all ring elements once per frame.
+    Every pixel around the fgc knows the distance to the closest contour point and which element that point belongs to."""
+    elements = [element for ring in features["rings"][2:] for element in ring]
+    distance_map = {"elements": elements, "distances": None}
+    if not elements:
+        return distance_map
+
+    # Only the area around the rings (plus the maximum distance a sample point may have to a contour) is needed
+    all_points = np.concatenate([element["contour"][:, 0, :] for element in elements])
+    padding = int(features["orientation_dot"]["distance_to_center"] * 0.3) + 2
+    offset_x, offset_y = all_points.min(axis=0) - padding
+    width, height = all_points.max(axis=0) - all_points.min(axis=0) + 2 * padding + 1
+
+    # Put the contour points with their element index (+1) into a label image and compute the distance transform with labels.
+    # Elements are written in reverse order, so the first element of a ring wins on shared points like in a sequential search.
+    element_ids_img = np.zeros((height, width), dtype=np.int32)
+    for element_index in range(len(elements) - 1, -1, -1):
+        points = elements[element_index]["contour"][:, 0, :]
+        element_ids_img[points[:, 1] - offset_y, points[:, 0] - offset_x] = element_index + 1
+    outlines = element_ids_img > 0
+    distances, labels = cv2.distanceTransformWithLabels(
+        np.where(outlines, 0, 255).astype(np.uint8), cv2.DIST_L2, 5, labelType=cv2.DIST_LABEL_PIXEL
+    )
+
+    # Map the label of every outline pixel to its element
+    label_to_element_index = np.zeros(labels.max() + 1, dtype=np.int32)
+    label_to_element_index[labels[outlines]] = element_ids_img[outlines] - 1
+
+    distance_map["offset"] = (int(offset_x), int(offset_y))
+    distance_map["distances"] = distances
+    distance_map["element_indices"] = label_to_element_index[labels]
+    return distance_map
+
+
+def get_closest_ring_element(distance_map, target_position, ring_element_ids):
+    """Get the ring element with the closest contour to the target position and the distance to it.
+    Falls back to checking all points of the ring if the closest contour belongs to another ring."""
+    if distance_map["distances"] is None:
+        return None, None
+    x = target_position[0] - distance_map["offset"][0]
+    y = target_position[1] - distance_map["offset"][1]
+    height, width = distance_map["distances"].shape
+    if x < 0 or y < 0 or x >= width or y >= height:
+        # Outside of the map means further away than any contour may be
+        return None, None
+
+    closest_element = distance_map["elements"][distance_map["element_indices"][y, x]]
+    if id(closest_element) in ring_element_ids:
+        return closest_element, float(distance_map["distances"][y, x])
+
+    ring_elements = [element for element in distance_map["elements"] if id(element) in ring_element_ids]
+    if not ring_elements:
+        return None, None
+    closest_point_distances = [
+        np.sqrt(((element["contour"][:, 0, :] - target_position)**2).sum(axis=1)).min() for element in ring_elements
+    ]
+    closest_index = int(np.argmin(closest_point_distances))
+    return ring_elements[closest_index], float(closest_point_distances[closest_index])
+
+
 def get_data_from_rings(features):
     currently_zero = True
     data_rings = []
     data = []
     
+    # Store the lists right away, so the bits read so far are available if the deadline is exceeded
     features["target_positions"] = []
-    features["data_rings"] = []
-    features["data"] = []
+    features["data_rings"] = data_rings
+    features["data"] = data
 
-    print(f"Getting data of { len(features['rings']) } rings...")
+    logger.debug(f"Getting data of { len(features['rings']) } rings...")
+
+    distance_map = build_ring_distance_map(features)
 
     for ring_id, ring in enumerate(features["rings"]):
+        check_deadline(features.get("deadline"), "getting data")
         
-        print(f"Ring #{ring_id} - Features:{len(features['rings'][ring_id])}")
+        logger.debug(f"Ring #{ring_id} - Features:{len(features['rings'][ring_id])}")
+        ring_element_ids = {id(element) for element in ring}
 
         # Skip first two "rings" because they are the center circle and the orientation ring+dot
         if ring_id < 2:
@@ -367,6 +722,7 @@ def get_data_from_rings(features):
         numBits = int( 360 / degrees_per_bit )
         
         current_contour_angle = None
+        ring_index = index_ring_elements_by_angle(ring, features["center_coordinates"])
 
         for pos in range(numBits):
             rotated_vector = vector_from_center_to_dot
@@ -378,11 +734,11 @@ def get_data_from_rings(features):
                 int(features["center_coordinates"][1] + rotated_vector[1])
             ]
 
-            # Check all contours if they contain the calculated position
+            # Check the contours spanning the angle of the calculated position if they contain it
             found_contour = False
             closest_contour = None
             total_closest_point_distance = None
-            for element in ring:
+            for element in ring_index[get_angle_bucket(target_position, features["center_coordinates"])]:
                 is_point_in_contour = cv2.pointPolygonTest(element["contour"], (target_position[0], target_position[1]), False)
                 if is_point_in_contour == 1:
                     # If target position lies within this contour, this is the one we are looking for
@@ -401,19 +757,9 @@ def get_data_from_rings(features):
                     current_contour_angle = element["angle"]
                     break
             
-            # Seperate from previous loop to prevent doing this time consuming calculation all the time
+            # If target position lies outside all contours, look up the closest contour in the distance map
             if not found_contour:
-                for element in ring:
-                    # If target position lies outside contour, keep track of the distance to this contour
-                    closest_point_distance_in_contour = None
-                    for point in element["contour"]:
-                        distance = calculate_distance(target_position, point[0])
-                        if closest_point_distance_in_contour is None or distance < closest_point_distance_in_contour:
-                            closest_point_distance_in_contour = distance
-
-                    if total_closest_point_distance is None or closest_point_distance_in_contour < total_closest_point_distance:
-                        total_closest_point_distance = closest_point_distance_in_contour
-                        closest_contour = element
+                closest_contour, total_closest_point_distance = get_closest_ring_element(distance_map, target_position, ring_element_ids)
 
             if not found_contour:
                 # If contour was not found yet, check the closest distance to a contour and decide if it should have been inside
@@ -437,5 +783,212 @@ def get_data_from_rings(features):
 
         data_rings.append(data_ring)
 
+    features["data_rings"] = data_rings
+    features["data"] = data
+
+
+def get_data_from_rings_polar(img, features):
+    """Unwrap the image around the fgc center into a polar image once and read every ring as a 1D intensity profile.
+    A bit position is part of the code if there is ink at its angle and the bit toggles whenever there is a gap between two positions."""
+    angle_steps_per_degree = 4
+    angle_steps = 360 * angle_steps_per_degree
+
+    center_x, center_y = features["center_coordinates"]
+    vector_from_center_to_orientation_point = [
+        features["orientation_dot"]["x"] - center_x,
+        features["orientation_dot"]["y"] - center_y,
+    ]
+    orientation_distance = math.hypot(vector_from_center_to_orientation_point[0], vector_from_center_to_orientation_point[1])
+    orientation_angle = math.degrees(math.atan2(vector_from_center_to_orientation_point[1], vector_from_center_to_orientation_point[0]))
+    ring_distance = orientation_distance / 2
+
+    # Unwrap everything up to the furthest image corner (rows = angle, columns = radius)
+    height, width = img.shape[:2]
+    max_radius = int(max(
+        calculate_distance((center_x, center_y), corner) for corner in [(0, 0), (width, 0), (0, height), (width, height)]
+    ))
+    polar_img = cv2.warpPolar(
+        img, (max_radius, angle_steps), (float(center_x), float(center_y)), max_radius,
+        cv2.WARP_POLAR_LINEAR + cv2.INTER_LINEAR
+    )
+    features["polar_img"] = polar_img
+
+    def rows_between(angle_a, angle_b):
+        """Rows of the polar image between two angles, wrapping around at 360 degrees."""
+        first_row = int(round(angle_a * angle_steps_per_degree))
+        rows = np.arange(first_row, first_row + int(round((angle_b - angle_a) * angle_steps_per_degree)) + 1)
+        return rows % angle_steps
+
+    data_rings = []
+    data = []
+    features["rings"] = []
+    features["target_positions"] = []
+    features["data_rings"] = data_rings
+    features["data"] = data
+
+    ring_id = 1
+    while True:
+        check_deadline(features.get("deadline"), "getting data")
+        radius = orientation_distance + ring_distance * ring_id
+        band_start = int(radius - ring_distance * 0.4)
+        band_end = int(radius + ring_distance * 0.4) + 1
+        gap_start = int(radius + ring_distance * 0.4)
+        gap_end = int(radius + ring_distance * 0.6) + 1
+        if gap_end >= max_radius or band_start < 0:
+            break
+
+        # The darkest value across the ring band per angle is the ring profile, the gap to the next ring is background
+        profile = polar_img[:, band_start:band_end].min(axis=1).astype(np.float32)
+        background = float(np.median(polar_img[:, gap_start:gap_end]))
+        ink = float(profile.min())
+        if background - ink < 30:
+            # No more ink in this ring -> FGC is finished
+            break
+        threshold = (ink + background) / 2
+        inked = profile < threshold
+
+        degrees_per_bit = CommonFunctions.get_degrees_per_bit(ring_id)
+        numBits = int(360 / degrees_per_bit)
+        quarter_angle = max(1 / angle_steps_per_degree, degrees_per_bit / 4)
+
+        data_ring = []
+        currently_zero = True   # Every ring begins with a zero
+        ring_complete = True
+        for pos in range(numBits):
+            angle = orientation_angle + degrees_per_bit * pos
+
+            # Position has to contain ink, otherwise the FGC is finished
+            if not inked[rows_between(angle - quarter_angle, angle + quarter_angle)].any():
+                ring_complete = False
+                break
+
+            if pos > 0:
+                # A gap between the previous and this position means the previous element was a dot -> bit changes
+                if not inked[rows_between(angle - degrees_per_bit + quarter_angle, angle - quarter_angle)].all():
+                    currently_zero = not currently_zero
+                bit = 0 if currently_zero else 1
+                data_ring.append(bit)
+                data.append(bit)
+
+            features["target_positions"].append([
+                int(center_x + radius * math.cos(math.radians(angle))),
+                int(center_y + radius * math.sin(math.radians(angle))),
+            ])
+
+        if pos == 0 and not ring_complete:
+            # Not even the first bit of the ring exists
+            break
+        data_rings.append(data_ring)
+        if not ring_complete:
+            # Only the last ring can end early
+            break
+        ring_id += 1
+
+    features["data_rings"] = data_rings
+    features["data"] = data
+
+
+def get_data_from_rings_run_length(features):
+    """Read the data bits by measuring the angular extent of every contour once.
+    An arc spans consecutive equal bits and every new contour changes the bit, so the run length of a contour
+    is its angular extent divided by the degrees per bit of the ring."""
+    data_rings = []
+    data = []
+    features["target_positions"] = []
+    features["data_rings"] = data_rings
+    features["data"] = data
+
+    center_x, center_y = features["center_coordinates"]
+    vector_from_center_to_orientation_point = [
+        features["orientation_dot"]["x"] - center_x,
+        features["orientation_dot"]["y"] - center_y,
+    ]
+    orientation_distance = math.hypot(vector_from_center_to_orientation_point[0], vector_from_center_to_orientation_point[1])
+    orientation_angle = math.degrees(math.atan2(vector_from_center_to_orientation_point[1], vector_from_center_to_orientation_point[0]))
+
+    logger.debug(f"Getting data of { len(features['rings']) } rings...")
+
+    for ring_id, ring in enumerate(features["rings"]):
+        check_deadline(features.get("deadline"), "getting data")
+
+        # Skip first two "rings" because they are the center circle and the orientation ring+dot
+        if ring_id < 2:
+            continue
+
+        ring_id = ring_id - 1
+        degrees_per_bit = CommonFunctions.get_degrees_per_bit(ring_id)
+        numBits = int(360 / degrees_per_bit)
+        radius = orientation_distance / 2 * (ring_id + 2)
+
+        # The round caps of the strokes stick out half a stroke width (a third of the ring distance) over the first and last bit
+        cap_angle = math.degrees((orientation_distance / 6) / radius)
+
+        # Measure the range of bit positions covered by every contour of the ring
+        runs = []
+        for element in ring:
+            points = element["contour"][:, 0, :].astype(np.float64)
+            angles = (np.degrees(np.arctan2(points[:, 1] - center_y, points[:, 0] - center_x)) - orientation_angle) % 360
+            angles = np.sort(angles)
+            gaps = np.diff(np.append(angles, angles[0] + 360))
+            largest_gap_index = int(np.argmax(gaps))
+            start_angle = angles[(largest_gap_index + 1) % len(angles)]
+            extent = 360 - gaps[largest_gap_index]
+
+            # Let runs start in [-180, 180) degrees, so a contour crossing the orientation starts before position 0
+            if start_angle >= 180:
+                start_angle -= 360
+            first_pos = int(round((start_angle + cap_angle) / degrees_per_bit))
+            last_pos = max(first_pos, int(round((start_angle + extent - cap_angle) / degrees_per_bit)))
+            runs.append([first_pos, min(last_pos, first_pos + numBits - 1)])
+
+        if not runs:
+            data_rings.append([])
+            continue
+
+        # Contours of the same run (e.g. inner and outer edge of a stroke) overlap -> merge them
+        runs.sort()
+        merged_runs = [runs[0]]
+        for first_pos, last_pos in runs[1:]:
+            if first_pos <= merged_runs[-1][1]:
+                merged_runs[-1][1] = max(merged_runs[-1][1], last_pos)
+            else:
+                merged_runs.append([first_pos, last_pos])
+
+        # A run that started before position 0 belongs to the end of the ring if it does not cover position 0
+        runs_from_orientation = []
+        for first_pos, last_pos in merged_runs:
+            if last_pos < 0:
+                first_pos, last_pos = first_pos + numBits, last_pos + numBits
+            runs_from_orientation.append([first_pos, last_pos])
+        runs_from_orientation.sort()
+
+        # The run covering position 0 wraps around, its part before position 0 is the end of the ring
+        wrapped_run = None
+        if runs_from_orientation[0][0] < 0:
+            wrapped_run = [runs_from_orientation[0][0] + numBits, numBits - 1]
+            runs_from_orientation[0][0] = 0
+            if wrapped_run[0] <= runs_from_orientation[-1][1]:
+                wrapped_run = None
+            else:
+                runs_from_orientation.append(wrapped_run)
+
+        # Every run fills the positions up to the next run, the first bit of every ring is always 0
+        data_ring = []
+        currently_zero = True
+        last_ring_pos = min(runs_from_orientation[-1][1], numBits - 1)
+        for run_id, (first_pos, last_pos) in enumerate(runs_from_orientation):
+            if run_id > 0:
+                currently_zero = not currently_zero
+            next_first_pos = runs_from_orientation[run_id + 1][0] if run_id + 1 < len(runs_from_orientation) else last_ring_pos + 1
+            for pos in range(max(first_pos, 1), min(next_first_pos, numBits)):
+                data_ring.append(0 if currently_zero else 1)
+
+        for pos in range(last_ring_pos + 1):
+            angle = math.radians(orientation_angle + degrees_per_bit * pos)
+            features["target_positions"].append([int(center_x + radius * math.cos(angle)), int(center_y + radius * math.sin(angle))])
+
+        data_rings.append(data_ring)
+        data.extend(data_ring)
+
     features["data_rings"] = data_rings
     features["data"] = data
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import asyncio
+import threading
+import numpy as np
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from .fgcreader import FGCReader
+
+
+# Asyncio reader running the reads on an executor, so the event loop is never blocked
+
+class FGCAsyncReader():
+
+    def __init__(self, executor=None, max_in_flight=None):
+        """The reads run on the executor, None means the default executor of the event loop.
+        At most max_in_flight reads (default: number of cores) run at once, further reads wait until one of them is finished."""
+        self.executor = executor
+        self.max_in_flight = max_in_flight if max_in_flight is not None else (os.cpu_count() or 1)
+        # Created in the event loop on the first read
+        self.semaphore = None
+
+    async def read_image(self, image_path=None, image_file=None, image=None, **read_kwargs):
+        """Reads an fgc from an image path, image bytes or an already decoded image without blocking the event loop.
+        When the awaiting task is cancelled, the read stops before its next pipeline stage so it does not use the cpu any longer.
+        Cancelling between stages needs a thread executor, reads in other processes always run to the end.
+        The read_kwargs are passed on to FGCReader.read_image."""
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        # Backpressure: wait until a read is finished if too many of them are running
+        async with self.semaphore:
+            cancel_event = None
+            if not isinstance(self.executor, ProcessPoolExecutor):
+                cancel_event = threading.Event()
+            read = partial(FGCReader.read_image, image_path=image_path, image_file=image_file, image=image, cancel_event=cancel_event, **read_kwargs)
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self.executor, read)
+            except asyncio.CancelledError:
+                if cancel_event is not None:
+                    cancel_event.set()
+                raise
+
+    async def read_images(self, images, **read_kwargs):
+        """Reads the fgcs of many images (image paths, image bytes or decoded images) concurrently and yields a read result per image in order.
+        Only max_in_flight images are taken from images at once, so they can be produced while reading."""
+        pending = deque()
+        try:
+            for image in images:
+                if len(pending) >= self.max_in_flight:
+                    yield await pending.popleft()
+                pending.append(asyncio.ensure_future(self.read_any(image, **read_kwargs)))
+            while pending:
+                yield await pending.popleft()
+        finally:
+            # Stop the remaining reads if the caller stops iterating early
+            for task in pending:
+                task.cancel()
+
+    async def read_any(self, image, **read_kwargs):
+        """Reads an image given as image path, image bytes (or other buffer) or decoded image."""
+        if isinstance(image, (str, os.PathLike)):
+            return await self.read_image(image_path=os.fspath(image), **read_kwargs)
+        if isinstance(image, np.ndarray):
+            return await self.read_image(image=image, **read_kwargs)
+        return await self.read_image(image_file=image, **read_kwargs)
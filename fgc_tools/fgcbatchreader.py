@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import argparse
+import cv2
+import numpy as np
+from collections import deque
+from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
+from .fgcreader import FGCReader
+from .readresult import ReadResult
+
+
+# Batch reader reading many images with a pool of worker processes
+
+class FGCBatchReader():
+
+    # Files with these extensions are read when a directory is given
+    IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+    @staticmethod
+    def read_images(image_paths, processes=None, chunk_size=16, ordered=True, **read_kwargs):
+        """Reads the fgcs of many images with a pool of worker processes and yields a result dict per image.
+        Paths are sent to the workers in chunks of chunk_size. Results are yielded in the order of the paths or, if not ordered,
+        as soon as they are ready, so they never have to be kept in memory. The read_kwargs are passed on to FGCReader.read_image."""
+        tasks = ((image_path, read_kwargs) for image_path in image_paths)
+        with Pool(processes=processes, initializer=FGCBatchReader.init_worker) as pool:
+            if ordered:
+                results = pool.imap(read_image_in_worker, tasks, chunksize=chunk_size)
+            else:
+                results = pool.imap_unordered(read_image_in_worker, tasks, chunksize=chunk_size)
+            for result in results:
+                yield result
+
+    @staticmethod
+    def init_worker() -> None:
+        """Prepares a worker process once, it keeps OpenCV and NumPy imported for all images it reads."""
+        # Every worker process uses one core, OpenCV should not start threads on top of that
+        cv2.setNumThreads(1)
+
+    @staticmethod
+    def read_images_in_threads(images, max_workers=None, max_in_flight=None, **read_kwargs):
+        """Reads the fgcs of many images with a pool of threads in this process and yields a read result per image in order.
+        Images are image paths, image bytes (or other buffers) or decoded images. At most max_in_flight images (default: twice the
+        number of threads) are read or waiting to be yielded at once. The read_kwargs are passed on to FGCReader.read_image."""
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_in_flight is None:
+            max_in_flight = max_workers * 2
+
+        def read_image(image):
+            if isinstance(image, (str, os.PathLike)):
+                return FGCReader.read_image(image_path=os.fspath(image), **read_kwargs)
+            if isinstance(image, np.ndarray):
+                return FGCReader.read_image(image=image, **read_kwargs)
+            return FGCReader.read_image(image_file=image, **read_kwargs)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = deque()
+            for image in images:
+                if len(futures) >= max_in_flight:
+                    yield futures.popleft().result()
+                futures.append(executor.submit(read_image, image))
+            while futures:
+                yield futures.popleft().result()
+
+    @staticmethod
+    def find_image_paths(paths):
+        """Yields the given image paths and the images in the given directories (recursively, in sorted order)."""
+        for path in paths:
+            if not os.path.isdir(path):
+                yield path
+                continue
+            for directory, directory_names, file_names in os.walk(path):
+                directory_names.sort()
+                for file_name in sorted(file_names):
+                    if file_name.lower().endswith(FGCBatchReader.IMAGE_EXTENSIONS):
+                        yield os.path.join(directory, file_name)
+
+    @staticmethod
+    def write_jsonl(results, output_file) -> int:
+        """Writes every result as one line of json as soon as it is available. Returns the number of written results."""
+        result_cnt = 0
+        for result in results:
+            output_file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output_file.flush()
+            result_cnt += 1
+        return result_cnt
+
+    @staticmethod
+    def main(argv=None) -> None:
+        """Command line entry point, reads images and directories and writes the results as json lines."""
+        parser = argparse.ArgumentParser(description="Read the Fancy Galaxy Codes of many images and write the results as json lines.")
+        parser.add_argument("paths", nargs="+", help="image files and directories containing images")
+        parser.add_argument("-o", "--output", help="json lines output file (default: stdout)")
+        parser.add_argument("-p", "--processes", type=int, default=None, help="number of worker processes (default: number of cores)")
+        parser.add_argument("-c", "--chunk-size", type=int, default=16, help="number of images sent to a worker at once")
+        parser.add_argument("-u", "--unordered", action="store_true", help="write results as soon as they are ready instead of in input order")
+        parser.add_argument("-e", "--engine", default="contour", help="engine reading the data bits (contour, polar or runlength)")
+        args = parser.parse_args(argv)
+
+        results = FGCBatchReader.read_images(
+            FGCBatchReader.find_image_paths(args.paths),
+            processes=args.processes,
+            chunk_size=args.chunk_size,
+            ordered=not args.unordered,
+            engine=args.engine
+        )
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output_file:
+                result_cnt = FGCBatchReader.write_jsonl(results, output_file)
+            print(f"Wrote {result_cnt} results to {args.output}.", file=sys.stderr)
+        else:
+            FGCBatchReader.write_jsonl(results, sys.stdout)
+
+
+def read_image_in_worker(task) -> dict:
+    """Reads a single image in a worker process and returns the fields of the read result as dict."""
+    image_path, read_kwargs = task
+    return read_image_as_dict(image_path, read_kwargs, image_path=image_path)
+
+
+def read_image_as_dict(path, read_kwargs, **image) -> dict:
+    """Reads an image given as image_path, image_file or image and returns the fields of the read result as dict.
+    The path is only stored in the dict. Errors are returned in the error field instead of being raised."""
+    try:
+        read_result = FGCReader.read_image(**image, **read_kwargs)
+        if not isinstance(read_result, ReadResult):
+            raise ValueError("Could not load the image.")
+    except Exception as ex:
+        return create_error_dict(path, ex)
+    return {
+        "path": path,
+        "text": read_result.text,
+        "version": read_result.version,
+        "has_error": read_result.has_error,
+        "read_time": read_result.read_time,
+        "found_fgc": read_result.found_fgc,
+        "error": None,
+    }
+
+
+def create_error_dict(path, error) -> dict:
+    """Returns the result dict of an image that could not be read."""
+    return {"path": path, "text": "", "version": 0, "has_error": True, "read_time": 0, "found_fgc": False, "error": str(error)}
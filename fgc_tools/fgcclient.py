@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import base64
+import socket
+import argparse
+import tempfile
+
+
+# Thin client of the reader server (see FGCServer), it only uses the standard library so it starts fast
+
+class FGCClient():
+
+    # Unix socket the server listens on if neither a socket path nor a port is given
+    DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "fgc-reader.sock")
+
+    # The server only listens on the loopback interface
+    HOST = "127.0.0.1"
+
+    def __init__(self, socket_path=None, port=None, timeout=None):
+        """Connects to the server on the unix socket path or, if a port is given, on that tcp port of localhost."""
+        if port is not None:
+            self.socket = socket.create_connection((FGCClient.HOST, port), timeout=timeout)
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(socket_path or FGCClient.DEFAULT_SOCKET_PATH)
+        self.stream = self.socket.makefile("rwb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        self.stream.close()
+        self.socket.close()
+
+    def read_image(self, image_path=None, image_file=None, **read_kwargs) -> dict:
+        """Reads an fgc from an image path (read by the server) or from image bytes.
+        Returns the fields of the read result as dict (path, text, version, has_error, read_time, found_fgc, error).
+        The read_kwargs are passed on to FGCReader.read_image by the server and have to be json serializable."""
+        if image_path is not None:
+            # The server does not run in the working directory of the client
+            request = {"path": os.path.abspath(image_path)}
+        elif image_file is not None:
+            request = {"image": base64.b64encode(image_file).decode("ascii")}
+        else:
+            raise ValueError("Give an image path or image bytes to read.")
+        if read_kwargs:
+            request["options"] = read_kwargs
+        self.stream.write(json.dumps(request).encode("utf-8") + b"\n")
+        self.stream.flush()
+        response = self.stream.readline()
+        if not response:
+            raise ConnectionError("The server closed the connection.")
+        return json.loads(response)
+
+    @staticmethod
+    def main(argv=None) -> None:
+        """Command line entry point, reads images with a running server and writes the results as json lines."""
+        parser = argparse.ArgumentParser(description="Read Fancy Galaxy Codes with a running reader server and write the results as json lines.")
+        parser.add_argument("paths", nargs="+", help="image files, - reads the image bytes from stdin")
+        parser.add_argument("-s", "--socket", default=None, help=f"unix socket of the server (default: {FGCClient.DEFAULT_SOCKET_PATH})")
+        parser.add_argument("--port", type=int, default=None, help="tcp port of the server on localhost (instead of the unix socket)")
+        parser.add_argument("-e", "--engine", default=None, help="engine reading the data bits (contour, polar or runlength)")
+        args = parser.parse_args(argv)
+
+        read_kwargs = {}
+        if args.engine is not None:
+            read_kwargs["engine"] = args.engine
+        with FGCClient(args.socket, args.port) as client:
+            for path in args.paths:
+                if path == "-":
+                    result = client.read_image(image_file=sys.stdin.buffer.read(), **read_kwargs)
+                else:
+                    result = client.read_image(image_path=path, **read_kwargs)
+                print(json.dumps(result, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    FGCClient.main()
@@ -5,13 +5,14 @@ import os
 from .libs.binarytools import print_bitarray
 from colour import Color
 from .libs.commonfunctions import CommonFunctions
+from .libs.commonconstants import CommonConstants
 
 
 class FGCDrawer:
 
     # Constants for drawing
-    CIRCLE_DISTANCE = 3
-    STROKE_WIDTH = 2
+    CIRCLE_DISTANCE = CommonConstants.CIRCLE_DISTANCE
+    STROKE_WIDTH = CommonConstants.STROKE_WIDTH
     DIRNAME = os.path.dirname(__file__)
     CSS_FILE = os.path.join(DIRNAME, "css/style.css")
 
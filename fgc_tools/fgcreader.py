@@ -6,156 +6,648 @@ from .readresult import ReadResult
 from .cvfunctions import *
 from .featurehandler import *
 from .libs.hamming import *
+import io
 import struct
+import logging
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 
+logger = logging.getLogger(__name__)
+
 # Currently used fgc reader
 
 class FGCReader():
 
-    def read_image(image_path=None, image_file=None) -> str:
-        np.seterr(invalid='ignore')
+    # Available engines for reading the data bits out of the rings
+    ENGINES = ("contour", "polar", "runlength")
+
+    # Images with more pixels get their longer edge resized to MAX_IMAGE_EDGE
+    MAX_IMAGE_PIXELS = 1_000_000
+    MAX_IMAGE_EDGE = 2500
+
+    # Jpegs can be decoded at a reduced resolution (the codec skips the details while decoding), largest reduction first
+    REDUCED_DECODE_FLAGS = (
+        (8, cv2.IMREAD_REDUCED_COLOR_8),
+        (4, cv2.IMREAD_REDUCED_COLOR_4),
+        (2, cv2.IMREAD_REDUCED_COLOR_2),
+    )
+
+    # Longer edge of the downscaled copy the fgc is located on in pyramid mode (smaller images are processed directly)
+    PYRAMID_IMAGE_EDGE = 1200
+
+    # Preprocessing recipes (color channel or None for gray, median blur sizes and canny thresholds), the first one is the default.
+    # In ensemble mode all of them are processed and their data bits are combined by majority vote.
+    PREPROCESSING_VARIANTS = (
+        {"channel": None, "blur": 5, "heavy_blur": 11, "canny": (55, 200)},
+        {"channel": None, "blur": 3, "heavy_blur": 9, "canny": (55, 200)},
+        {"channel": None, "blur": 7, "heavy_blur": 13, "canny": (40, 150)},
+        {"channel": 1, "blur": 5, "heavy_blur": 11, "canny": (55, 200)},
+        {"channel": 2, "blur": 5, "heavy_blur": 11, "canny": (30, 120)},
+    )
+
+    def read_image(image_path=None, image_file=None, engine="contour", pyramid=False, precheck=False, deadline_ms=None, ensemble=False, center_candidates=1, overlay=False, image=None, reduced_decode=True, cancel_event=None) -> str:
+        """Reads an fgc from an image path, image bytes or an already decoded BGR or gray image (see load_image).
+        The engine decides how the data bits are read: "contour" samples the contours of every ring, "polar" unwraps the image around the center once
+        and "runlength" measures the angular extent of every contour.
+        In pyramid mode the fgc is located on a small copy of the image first and only a full resolution crop around it is processed.
+        With precheck, frames without the center structure of an fgc are rejected after 5 to 30 ms with an empty read result (see check_fgc_presence).
+        With deadline_ms, reading stops once that many milliseconds have passed. The read result is then marked as timed out,
+        holds the stage that was running and whatever could be decoded from the bits read so far.
+        In ensemble mode the image is processed with all preprocessing variants concurrently and the data bits are decided by majority vote.
+        With more than one center candidate, the best scored centers are read one after another until one of them holds valid data.
+        With overlay, the detected geometry is recorded and the output image of the read result is drawn when it is accessed.
+        With reduced_decode, jpegs with a longer edge of at least twice MAX_IMAGE_EDGE are decoded at a reduced resolution (see load_image).
+        The cancel_event is a threading.Event, once it is set the read stops before the next stage and raises ReadCancelled."""
+        if engine not in FGCReader.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', use one of {FGCReader.ENGINES}.")
+        # Measure time of calculations for optimization purposes (since it will be re-written in C++ for mobile devices later)
+        # The time budget includes loading the image
+        start_time = time.time()
+        deadline = None
+        if deadline_ms is not None:
+            deadline = start_time + deadline_ms / 1000
 
         read_result = ReadResult()
 
-        # Run operations on img and draw on output_img
+        img = FGCReader.load_image(image_path, image_file, image, reduced_decode)
+        if img is None:
+            return ("", [], 0, "-", None, None)
+
+        # Features is used to store a lot of useful information 
+        features = FGCReader.create_features(deadline, cancel_event)
+        overlay_img = None
+        region = None
+        try:
+            check_stage(features, "loading image")
+
+            if precheck and not check_fgc_presence(img):
+                logger.debug("Presence check rejected the image.")
+                read_result.read_time = (time.time() - start_time)
+                return read_result
+
+            crop = None
+            if pyramid:
+                crop = FGCReader.locate_with_pyramid(img, deadline)
+                logger.debug("Time locating fgc on pyramid: %s", time.time() - start_time)
+
+            if crop is not None:
+                # Process only the crop at the resolution the whole image would have been processed at
+                scale = FGCReader.get_limited_image_scale(img)
+                region = tuple(int(coordinate * scale) for coordinate in crop)
+                x_start, y_start, x_end, y_end = region
+                work_img = img[int(y_start / scale):int(y_end / scale), int(x_start / scale):int(x_end / scale)]
+                if scale != 1:
+                    work_img = cv2.resize(work_img, (x_end - x_start, y_end - y_start), interpolation=cv2.INTER_CUBIC)
+                if overlay:
+                    # The overlay is only drawn on, so a cheap resize is good enough for it
+                    overlay_img = FGCReader.limit_image_size(img, inter=cv2.INTER_NEAREST)
+                logger.debug(f"Processing crop of {x_end - x_start}x{y_end - y_start} at ({x_start}, {y_start}).")
+            else:
+                img = FGCReader.limit_image_size(img)
+                work_img = img
+                overlay_img = img
+            check_stage(features, "resizing image")
+
+            if ensemble:
+                processed = FGCReader.process_image_ensemble(work_img, features, engine, start_time, center_candidates)
+            else:
+                processed = FGCReader.process_image(work_img, features, engine, start_time, center_candidates=center_candidates)
+
+            if crop is not None and not processed:
+                # The crop was wrong, process the whole image after all
+                logger.debug("Could not process crop, processing the whole image.")
+                img = FGCReader.limit_image_size(img)
+                overlay_img = img
+                region = None
+                features = FGCReader.create_features(deadline, cancel_event)
+                check_stage(features, "resizing image")
+                if ensemble:
+                    processed = FGCReader.process_image_ensemble(img, features, engine, start_time, center_candidates)
+                else:
+                    processed = FGCReader.process_image(img, features, engine, start_time, center_candidates=center_candidates)
+        except DeadlineExceeded as ex:
+            # Keep everything found so far, the bits read until now are decoded below
+            logger.debug(f"Deadline of {deadline_ms} ms exceeded while {ex.stage}.")
+            read_result.timed_out = True
+            read_result.timeout_stage = ex.stage
+            processed = features["center_coordinates"] is not None
+
+        # Store read time and the geometry to draw the output image from
+        read_result.found_fgc = processed
+        read_result.read_time = (time.time() - start_time)
+        if overlay and overlay_img is not None:
+            read_result.overlay_img = overlay_img
+            read_result.overlays = [FGCReader.create_overlay(features, region)]
+
+        FGCReader.decode_data(features, read_result)
+        return read_result
+
+    def read_image_tiled(image_path=None, image_file=None, engine="contour", tile_size=2000, tile_overlap=600, max_workers=1, overlay=False, image=None, max_candidates=20) -> list:
+        """Reads all fgcs of a very large image (e.g. a flatbed scan) at native resolution.
+        The image is searched in overlapping tiles, one at a time or max_workers in parallel, so only a few tiles are processed at once.
+        Every tile is searched for all of its fgcs like in read_image_multi (max_candidates centers per tile).
+        Centers found in more than one tile are merged and every found fgc is read from a crop around it.
+        Returns a read result for every fgc that could be decoded, with overlay the output image of each result is its crop."""
+        if engine not in FGCReader.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', use one of {FGCReader.ENGINES}.")
+        if tile_overlap >= tile_size:
+            raise ValueError("The tile overlap has to be smaller than the tile size.")
+        img = FGCReader.load_image(image_path, image_file, image)
+        if img is None:
+            return []
+        height, width = img.shape[:2]
+
+        # Tiles overlap, so an fgc smaller than the overlap is completely inside of at least one tile
+        step = tile_size - tile_overlap
+        tiles = [
+            (x_start, y_start, min(width, x_start + tile_size), min(height, y_start + tile_size))
+            for y_start in range(0, max(1, height - tile_overlap), step)
+            for x_start in range(0, max(1, width - tile_overlap), step)
+        ]
+        logger.debug(f"Searching {len(tiles)} tiles of {tile_size}x{tile_size} pixels.")
+
+        def locate_in_tile(tile):
+            x_start, y_start, x_end, y_end = tile
+            candidates = []
+            for candidate_features in FGCReader.find_fgcs(img[y_start:y_end, x_start:x_end], engine, max_candidates):
+                center_x, center_y = candidate_features["center_coordinates"]
+                # Read the crop with a margin of a ring distance for blurry edges
+                radius = candidate_features["fgc_radius"] + candidate_features["orientation_dot"]["distance_to_center"] / 2
+                # Fgcs cut by an inner tile border are less reliable than the same fgc seen completely in another tile
+                border_distance = min(
+                    center_x if x_start > 0 else width, center_y if y_start > 0 else height,
+                    (x_end - x_start) - center_x if x_end < width else width, (y_end - y_start) - center_y if y_end < height else height
+                )
+                candidates.append((x_start + center_x, y_start + center_y, radius, border_distance - radius))
+            return candidates
+
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                candidates = [candidate for tile_candidates in executor.map(locate_in_tile, tiles) for candidate in tile_candidates]
+        else:
+            candidates = [candidate for tile_candidates in map(locate_in_tile, tiles) for candidate in tile_candidates]
+
+        # Merge candidates near each other, the most complete one wins
+        hits = []
+        for candidate in sorted(candidates, key=lambda candidate: -candidate[3]):
+            if all(calculate_distance(candidate, hit) > max(candidate[2], hit[2]) for hit in hits):
+                hits.append(candidate)
+        logger.debug(f"Found {len(candidates)} candidates in tiles, {len(hits)} after merging.")
+
+        read_results = []
+        for center_x, center_y, radius, _completeness in hits:
+            x_start, y_start = max(0, int(center_x - radius)), max(0, int(center_y - radius))
+            x_end, y_end = min(width, int(center_x + radius) + 1), min(height, int(center_y + radius) + 1)
+            read_result = FGCReader.read_region(img[y_start:y_end, x_start:x_end], engine, overlay)
+            if read_result.text:
+                read_results.append(read_result)
+        return read_results
+
+    def read_image_multi(image_path=None, image_file=None, engine="contour", max_candidates=20, max_workers=1, overlay=False, image=None, reduced_decode=True) -> list:
+        """Reads all fgcs of an image (e.g. a shelf of labeled bins) with a single preprocessing and contour pass.
+        The data around the best max_candidates centers is read, one at a time or max_workers in parallel.
+        Returns a read result for every center holding valid data which does not lie inside of an fgc with a better score.
+        With overlay, the output image of every read result shows all found fgcs. Reduced_decode works like in read_image."""
+        if engine not in FGCReader.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', use one of {FGCReader.ENGINES}.")
+        img = FGCReader.load_image(image_path, image_file, image, reduced_decode)
+        if img is None:
+            return []
+        start_time = time.time()
+        img = FGCReader.limit_image_size(img)
+
+        read_results = []
+        overlays = []
+        for candidate_features in FGCReader.find_fgcs(img, engine, max_candidates, max_workers, start_time):
+            read_result = ReadResult()
+            read_result.found_fgc = True
+            read_result.read_time = (time.time() - start_time)
+            if overlay:
+                # All read results share the list, so every output image shows all fgcs
+                overlays.append(FGCReader.create_overlay(candidate_features))
+                read_result.overlay_img = img
+                read_result.overlays = overlays
+            FGCReader.decode_data(candidate_features, read_result)
+            read_results.append(read_result)
+        logger.debug(f"Found {len(read_results)} fgcs.")
+        return read_results
+
+    @staticmethod
+    def find_fgcs(img, engine="contour", max_candidates=20, max_workers=1, start_time=None) -> list:
+        """Finds all fgcs of an image with a single preprocessing and contour pass and reads their data bits.
+        Returns the features of every center candidate holding valid data which does not lie inside of an fgc with a better score,
+        in score order. Their "fgc_radius" is the distance from the center up to which the fgc reaches."""
+        if start_time is None:
+            start_time = time.time()
+        features = FGCReader.create_features()
+        blurred_gray_img, heavy_blurred_gray_img, edged = FGCReader.preprocess_image(img)
+        if not find_circle_positions_with_hough_transform(heavy_blurred_gray_img, features, max_circles=None):
+            logger.debug("Could not find FGC at all.")
+            return []
+        if not find_center_with_contours(edged, img, features, candidate_count=max_candidates):
+            logger.debug("Could not find center of circle.")
+            return []
+        logger.debug(f"Reading data around {len(features['center_candidates'])} center candidates.")
+
+        def read_center_candidate(center_candidate):
+            candidate_features = FGCReader.features_for_center_candidate(features, center_candidate)
+            try:
+                FGCReader.read_data_at_center(blurred_gray_img, candidate_features, engine, start_time)
+            except Exception as ex:
+                # Most candidates are no center at all and can break any of the stages
+                logger.debug(f"Could not read data around center candidate at {center_candidate['center_coordinates']}: {ex}")
+                return None
+            return candidate_features
+
+        if max_workers > 1 and len(features["center_candidates"]) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                all_candidate_features = list(executor.map(read_center_candidate, features["center_candidates"]))
+        else:
+            all_candidate_features = list(map(read_center_candidate, features["center_candidates"]))
+
+        # Candidates are in score order, centers inside of an fgc read before are parts of it
+        found_fgcs = []
+        for candidate_features in all_candidate_features:
+            if candidate_features is None or not validate_data_bits(candidate_features["data"]):
+                continue
+            center_coordinates = candidate_features["center_coordinates"]
+            if any(calculate_distance(center_coordinates, found["center_coordinates"]) < found["fgc_radius"] for found in found_fgcs):
+                continue
+            orientation_distance = candidate_features["orientation_dot"]["distance_to_center"]
+            candidate_features["fgc_radius"] = orientation_distance / 2 * (len(candidate_features["data_rings"]) + 3)
+            found_fgcs.append(candidate_features)
+        return found_fgcs
+
+    @staticmethod
+    def read_region(img, engine="contour", overlay=False) -> ReadResult:
+        """Reads an fgc from a region of an already loaded image."""
+        read_result = ReadResult()
+        start_time = time.time()
+        img = FGCReader.limit_image_size(img)
+        features = FGCReader.create_features()
+        read_result.found_fgc = FGCReader.process_image(img, features, engine, start_time)
+        read_result.read_time = (time.time() - start_time)
+        if overlay:
+            read_result.overlay_img = img
+            read_result.overlays = [FGCReader.create_overlay(features)]
+        FGCReader.decode_data(features, read_result)
+        return read_result
+
+    @staticmethod
+    def load_image(image_path=None, image_file=None, image=None, reduced_decode=False):
+        """Loads an image from an image path, image bytes or an already decoded image. Returns None if none is given
+        and raises ValueError if the image can not be decoded.
+        Image bytes can be any object supporting the buffer protocol (bytes, bytearray, memoryview, ...).
+        Decoded images are BGR, BGRA or gray uint8 arrays (or buffer objects of that shape) and are used without copying.
+        With reduced_decode, large jpegs are decoded at the smallest resolution limit_image_size would not enlarge.
+        They stay in color, so color channel variants and contour colors are the same as for the full resolution image."""
         if image_path:
-            img = cv2.imread(image_path)
-        elif image_file:
-            image_path = "Memory"
-            img = cv2.imdecode(np.fromstring(image_file, np.uint8), 1)
+            flag = cv2.IMREAD_COLOR
+            if reduced_decode:
+                with open(image_path, "rb") as image_stream:
+                    flag = FGCReader.get_reduced_decode_flag(image_stream)
+            img = cv2.imread(image_path, flag)
+            if img is None:
+                raise ValueError(f"Could not decode image {image_path}.")
+        elif image_file is not None and len(image_file) > 0:
+            flag = cv2.IMREAD_COLOR
+            if reduced_decode:
+                flag = FGCReader.get_reduced_decode_flag(io.BytesIO(image_file))
+            img = cv2.imdecode(np.frombuffer(image_file, np.uint8), flag)
+            if img is None:
+                raise ValueError(f"Could not decode image of {len(image_file)} bytes.")
+        elif image is not None:
+            img = np.asarray(image)
+            if img.ndim == 3 and img.shape[2] == 1:
+                img = img[:, :, 0]
+            if img.dtype != np.uint8 or img.ndim not in (2, 3) or (img.ndim == 3 and img.shape[2] not in (3, 4)):
+                raise ValueError(f"Images have to be BGR, BGRA or gray uint8 arrays, got {img.dtype} array of shape {img.shape}.")
         else:
-            return ("", [], 0, "-", None, None)
+            return None
 
         # Get image dimensions
         height = img.shape[0]
         width = img.shape[1]
-        print("Width:  ", width)
-        print("Height: ", height)
+        logger.debug("Width:   %s", width)
+        logger.debug("Height:  %s", height)
+        return img
+
+    @staticmethod
+    def get_reduced_decode_flag(image_stream) -> int:
+        """Picks the imread flag for an encoded image from the dimensions in its jpeg header.
+        The image is reduced as much as possible while it stays at least as large as limit_image_size would make it,
+        so the following processing is the same. Other images and small jpegs are decoded normally."""
+        size = FGCReader.read_jpeg_size(image_stream)
+        if size is None:
+            return cv2.IMREAD_COLOR
+        width, height = size
+        if width * height <= FGCReader.MAX_IMAGE_PIXELS:
+            return cv2.IMREAD_COLOR
+        for factor, flag in FGCReader.REDUCED_DECODE_FLAGS:
+            # Round the reduced size down to be on the safe side
+            reduced_width, reduced_height = width // factor, height // factor
+            if max(reduced_width, reduced_height) >= FGCReader.MAX_IMAGE_EDGE and reduced_width * reduced_height > FGCReader.MAX_IMAGE_PIXELS:
+                logger.debug(f"Decoding jpeg reduced by {factor}.")
+                return flag
+        return cv2.IMREAD_COLOR
+
+    @staticmethod
+    def read_jpeg_size(image_stream):
+        """Reads (width, height) from the start of frame segment of a jpeg without decoding it. Returns None for other images."""
+        try:
+            if image_stream.read(2) != b"\xff\xd8":
+                return None
+            while True:
+                marker = image_stream.read(2)
+                if len(marker) != 2 or marker[0] != 0xFF:
+                    return None
+                # Markers can be padded with any number of 0xFF
+                while marker[1] == 0xFF:
+                    marker = marker[1:] + image_stream.read(1)
+                segment_length = struct.unpack(">H", image_stream.read(2))[0]
+                # Start of frame markers, except for the huffman table, arithmetic coding and conditioning markers
+                if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                    _precision, height, width = struct.unpack(">BHH", image_stream.read(5))
+                    return width, height
+                image_stream.seek(segment_length - 2, io.SEEK_CUR)
+        except (struct.error, IndexError):
+            return None
+
+    @staticmethod
+    def create_features(deadline=None, cancel_event=None) -> dict:
+        """Creates the dict used to store a lot of useful information while reading an fgc.
+        The deadline is a time.time() timestamp after which reading is stopped, None means no deadline.
+        The cancel event is a threading.Event which stops reading once it is set, None means the read can not be cancelled."""
+        return {
+            "deadline": deadline,
+            "cancel_event": cancel_event,
+            "data": [],
+            "center_coordinates": None,
+            "center_circle": None,
+            "orientation_ring": None,
+            "orientation_dot": None,
+            "hough_circle_positions": None,
+            "hough_circles": None
+        }
 
-        # Resize images if they are too large
-        if width * height > 1_000_000:
-            max_w_h = 2500
+    @staticmethod
+    def limit_image_size(img, inter=cv2.INTER_CUBIC):
+        """Resizes images if they are too large."""
+        height = img.shape[0]
+        width = img.shape[1]
+        if width * height > FGCReader.MAX_IMAGE_PIXELS:
+            max_w_h = FGCReader.MAX_IMAGE_EDGE
             resized = True
             if width >= height and width > max_w_h:
-                img = image_resize(img, width=max_w_h, inter=cv2.INTER_CUBIC)
+                img = image_resize(img, width=max_w_h, inter=inter)
             elif height > max_w_h:
-                img = image_resize(img, height=max_w_h, inter=cv2.INTER_CUBIC)
+                img = image_resize(img, height=max_w_h, inter=inter)
             else:
                 resized = False
             if resized:
                 height = img.shape[0]
                 width = img.shape[1]
-                print("Resized the image.")
-                print("Width:  ", width)
-                print("Height: ", height)
+                logger.debug("Resized the image.")
+                logger.debug("Width:   %s", width)
+                logger.debug("Height:  %s", height)
+        return img
 
-        # Get image dimensions after resize
+    @staticmethod
+    def get_limited_image_scale(img) -> float:
+        """Returns the factor limit_image_size scales the width of the image with (1 if it is small enough)."""
         height = img.shape[0]
         width = img.shape[1]
+        if width * height > FGCReader.MAX_IMAGE_PIXELS:
+            max_w_h = FGCReader.MAX_IMAGE_EDGE
+            if width >= height and width > max_w_h:
+                return max_w_h / width
+            elif height > max_w_h:
+                return int(width * (max_w_h / height)) / width
+        return 1
 
-        # Features is used to store a lot of useful information 
-        features = {
-            "center_coordinates": None,
-            "center_circle": None,
-            "orientation_ring": None,
-            "orientation_dot": None,
-            "hough_circle_positions": None,
-            "hough_circles": None
-        }
+    @staticmethod
+    def preprocess_image(img, variant=None):
+        """Calculates some alternative representations of the input image.
+        The variant is one of the PREPROCESSING_VARIANTS, the first one is used if none is given."""
+        if variant is None:
+            variant = FGCReader.PREPROCESSING_VARIANTS[0]
+        if variant["channel"] is None or img.ndim == 2:
+            # Gray images are used as they are
+            gray_img = to_gray(img)
+        else:
+            gray_img = cv2.extractChannel(img, variant["channel"])
+        blurred_gray_img = cv2.medianBlur(gray_img, variant["blur"])
+        heavy_blurred_gray_img = cv2.medianBlur(gray_img, variant["heavy_blur"])
+        edged = cv2.Canny(blurred_gray_img, *variant["canny"])
+        # _, binary_img = cv2.threshold(gray_img, 150, 255, cv2.THRESH_BINARY)
+        return blurred_gray_img, heavy_blurred_gray_img, edged
 
-        # Measure time of calculations for optimization purposes (since it will be re-written in C++ for mobile devices later)
-        start_time = time.time()
+    @staticmethod
+    def locate_with_pyramid(img, deadline=None):
+        """Locates the fgc and its ring spacing on a downscaled copy of the image.
+        Returns the region (x_start, y_start, x_end, y_end) of the full resolution image containing the fgc or None if it could not be located."""
+        height, width = img.shape[:2]
+        if max(width, height) <= FGCReader.PYRAMID_IMAGE_EDGE * 2:
+            return None
+        if width >= height:
+            small_img = image_resize(img, width=FGCReader.PYRAMID_IMAGE_EDGE, inter=cv2.INTER_AREA)
+        else:
+            small_img = image_resize(img, height=FGCReader.PYRAMID_IMAGE_EDGE, inter=cv2.INTER_AREA)
+        scale = width / small_img.shape[1]
 
-        # Calculate some alternative representations of the input image
-        output_img = img.copy()
-        gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        blurred_gray_img = cv2.medianBlur(gray_img, 5)
-        heavy_blurred_gray_img = cv2.medianBlur(gray_img, 11)
-        edged = cv2.Canny(blurred_gray_img, 55, 200)
-        # _, binary_img = cv2.threshold(gray_img, 150, 255, cv2.THRESH_BINARY)
-        print("Time conversions:", (time.time() - start_time))
+        location = FGCReader.locate_fgc(small_img, deadline)
+        if location is None:
+            return None
+        center_x, center_y, fgc_radius = [value * scale for value in location]
+        x_start, y_start = max(0, int(center_x - fgc_radius)), max(0, int(center_y - fgc_radius))
+        x_end, y_end = min(width, int(center_x + fgc_radius) + 1), min(height, int(center_y + fgc_radius) + 1)
+        return (x_start, y_start, x_end, y_end)
+
+    @staticmethod
+    def locate_fgc(img, deadline=None):
+        """Locates the center of the fgc and the radius it covers (including a margin) without reading any data.
+        Returns (center_x, center_y, radius) or None if no fgc could be located."""
+        features = FGCReader.create_features(deadline)
+        _blurred_gray_img, heavy_blurred_gray_img, edged = FGCReader.preprocess_image(img)
+        if not find_circle_positions_with_hough_transform(heavy_blurred_gray_img, features):
+            return None
+        if not find_center_with_contours(edged, img, features):
+            return None
+        find_orientation_dot(features)
+        sanitize_data(features)
+
+        # The fgc reaches up to the furthest remaining element, add a margin of two ring distances for blurry edges
+        orientation_distance = features["orientation_dot"]["distance_to_center"]
+        fgc_radius = max(element["furthest_distance_to_center"] for element in features["possible_fgc_elements"])
+        return (features["center_coordinates"][0], features["center_coordinates"][1], fgc_radius + orientation_distance)
+
+    @staticmethod
+    def process_image(img, features, engine, start_time, variant=None, center_candidates=1) -> bool:
+        """Finds the fgc in the image and reads its data bits into the features. Returns True if an fgc was processed.
+        With more than one center candidate, the best scored centers are tried until one of them holds valid data.
+        Raises DeadlineExceeded if the deadline of the features passes before a stage (or while a long running stage) is finished
+        and ReadCancelled if the cancel event of the features is set before a stage."""
+        check_stage(features, "preprocessing")
+        blurred_gray_img, heavy_blurred_gray_img, edged = FGCReader.preprocess_image(img, variant)
+        logger.debug("Time conversions: %s", time.time() - start_time)
+
+        check_stage(features, "finding circles")
+        if not find_circle_positions_with_hough_transform(heavy_blurred_gray_img, features):
+            logger.debug("Could not find FGC at all.")
+            return False
+        logger.debug("Time finding circles: %s", time.time() - start_time)
+
+        check_stage(features, "finding center")
+        if not find_center_with_contours(edged, img, features, candidate_count=center_candidates):
+            logger.debug("Could not find center of circle.")
+            return False
+        logger.debug("Time finding center: %s", time.time() - start_time)
 
-        if find_circle_positions_with_hough_transform(heavy_blurred_gray_img, features):
-            print("Time finding circles:", (time.time() - start_time))
-            if find_center_with_contours(edged, img, output_img, features):
-                print("Time finding center:", (time.time() - start_time))
+        if center_candidates > 1:
+            if not FGCReader.read_data_at_center_candidates(blurred_gray_img, features, engine, start_time):
+                logger.debug("Could not read data at any center candidate.")
+                return False
+        else:
+            FGCReader.read_data_at_center(blurred_gray_img, features, engine, start_time)
+
+        logger.debug("Processed FGC successfully.")
+        return True
 
-                # Now that we've found the center circle of the fgc, do some more examination of the data and contours
-                find_orientation_dot(features)
-                print("Time finding orientation dot:", (time.time() - start_time))
+    @staticmethod
+    def read_data_at_center(blurred_gray_img, features, engine, start_time) -> None:
+        """Reads the data bits of the fgc around the center stored in the features."""
+        # Degenerate geometry (e.g. of a wrong center) may produce nan values, which are handled like any other bad value.
+        # The error state only changes for this thread and is restored afterwards.
+        with np.errstate(invalid='ignore'):
+            # Now that we've found the center circle of the fgc, do some more examination of the data and contours
+            check_stage(features, "finding orientation dot")
+            find_orientation_dot(features)
+            logger.debug("Time finding orientation dot: %s", time.time() - start_time)
+            if engine == "polar":
+                check_stage(features, "getting data")
+                get_data_from_rings_polar(blurred_gray_img, features)
+                logger.debug("Time getting data from polar image: %s", time.time() - start_time)
+            else:
+                check_stage(features, "sanitizing data")
                 sanitize_data(features)
-                print("Time sanitizing data:", (time.time() - start_time))
+                logger.debug("Time sanitizing data: %s", time.time() - start_time)
+                check_stage(features, "getting angles")
                 get_all_angles(features)
-                print("Time getting angles:", (time.time() - start_time))
-                divide_elements_into_rings_by_angle_and_distance(features)
-                print("Time dividing elements into rings:", (time.time() - start_time))
-                get_data_from_rings(features)
-                print("Time getting data:", (time.time() - start_time))
-
-                # Print some info on the output image
-                cv2.circle(output_img, (features["center_coordinates"][0], features["center_coordinates"][1]), 4, (255,255,255), 2)
-
-                for target_position in features["target_positions"]:
-                    cv2.drawMarker(output_img, (target_position[0], target_position[1]), (0,255,0), cv2.MARKER_TILTED_CROSS, 5, 1)
-
-                for ring_id, ring in enumerate(features["rings"]):
-                    for element_id, element in enumerate(ring):
-                        # cv2.circle(output_img, (element["x"], element["y"]), 4, (255,255,0), 1)
-
-                        outline_color = (255,255,0)
-                        if ring_id % 2:
-                            outline_color = (0,255,255)
-                        if ring_id > 1:
-                            cv2.drawContours(output_img, [element["contour"]], 0, outline_color, 1)
-
-                        # cv2.putText(
-                        #     output_img, 
-                        #     str(ring_id) + ":" + str(element_id), 
-                        #     (element["x"], element["y"] - 15), 
-                        #     cv2.FONT_HERSHEY_SIMPLEX, 
-                        #     0.5, (0,190,0), 1, cv2.LINE_AA
-                        # )
-                        # cv2.putText(
-                        #     output_img, 
-                        #     str(int(element["angle"])) + " deg", 
-                        #     (element["x"], element["y"]), 
-                        #     cv2.FONT_HERSHEY_SIMPLEX, 
-                        #     0.5, (190,0,0), 1, cv2.LINE_AA
-                        # )
-                        # cv2.putText(
-                        #     output_img, 
-                        #     str(int(element["furthest_distance_to_center"])), 
-                        #     (element["x"], element["y"] + 15), 
-                        #     cv2.FONT_HERSHEY_SIMPLEX, 
-                        #     0.5, (0,0,190), 1, cv2.LINE_AA
-                        # )
-
-                # Draw outline of center and orientation ring
-                cv2.drawContours(output_img, [features["center_circle"]], 0, (0, 255, 0), 2)
-                cv2.drawContours(output_img, [features["orientation_dot"]["contour"]], 0, (255, 0, 0), 2)
-                cv2.drawContours(output_img, [features["orientation_ring"]], 0, (0, 200, 0), 2)
-
-                print("Processed FGC successfully.")
-            else:
-                print("Could not find center of circle.")
-        else:
-            print("Could not find FGC at all.")
-        
-        # Store read time and output img
-        read_result.read_time = (time.time() - start_time)
-        read_result.output_img = output_img
-        
+                logger.debug("Time getting angles: %s", time.time() - start_time)
+                check_stage(features, "dividing elements into rings")
+                divide_elements_into_rings_by_predicted_radii(features)
+                logger.debug("Time dividing elements into rings: %s", time.time() - start_time)
+                check_stage(features, "getting data")
+                if engine == "runlength":
+                    get_data_from_rings_run_length(features)
+                else:
+                    get_data_from_rings(features)
+                logger.debug("Time getting data: %s", time.time() - start_time)
+
+    @staticmethod
+    def read_data_at_center_candidates(blurred_gray_img, features, engine, start_time) -> bool:
+        """Reads the data bits around the center candidates in score order and stops at the first one with valid data bits.
+        The features of that candidate are stored in features, or the ones of the best scored readable candidate if none is valid.
+        Returns False if no candidate could be read at all."""
+        best_features = None
+        for candidate_id, center_candidate in enumerate(features["center_candidates"]):
+            candidate_features = FGCReader.features_for_center_candidate(features, center_candidate)
+            try:
+                FGCReader.read_data_at_center(blurred_gray_img, candidate_features, engine, start_time)
+            except DeadlineExceeded:
+                features.update(best_features if best_features is not None else candidate_features)
+                raise
+            except ReadCancelled:
+                raise
+            except Exception as ex:
+                # A wrong center can break any of the following stages
+                logger.debug(f"Could not read data around center candidate #{candidate_id}: {ex}")
+                continue
+
+            if validate_data_bits(candidate_features["data"]):
+                logger.debug(f"Center candidate #{candidate_id} (score {center_candidate['score']}) holds valid data.")
+                features.update(candidate_features)
+                return True
+            logger.debug(f"Center candidate #{candidate_id} (score {center_candidate['score']}) holds invalid data.")
+            if best_features is None:
+                best_features = candidate_features
+
+        if best_features is None:
+            return False
+        features.update(best_features)
+        return True
+
+    @staticmethod
+    def features_for_center_candidate(features, center_candidate) -> dict:
+        """Creates a copy of the features with the center of the center candidate.
+        The candidate gets its own copies of the elements, because they get values depending on the center."""
+        candidate_features = dict(features)
+        candidate_features["center_coordinates"] = center_candidate["center_coordinates"]
+        candidate_features["center_circle"] = center_candidate["center_circle"]
+        candidate_features["orientation_ring"] = center_candidate["orientation_ring"]
+        candidate_features["possible_fgc_elements"] = [dict(element) for element in features["possible_fgc_elements"]]
+        candidate_features["data"] = []
+        return candidate_features
+
+    @staticmethod
+    def process_image_ensemble(img, features, engine, start_time, center_candidates=1) -> bool:
+        """Processes the image with every preprocessing variant concurrently (OpenCV releases the GIL) and votes on their data bits.
+        The features of the first variant that processed an fgc are stored in features together with the voted data bits.
+        Returns True if any variant processed an fgc."""
+        def process_variant(variant):
+            variant_features = FGCReader.create_features(features["deadline"], features["cancel_event"])
+            try:
+                processed = FGCReader.process_image(img, variant_features, engine, start_time, variant, center_candidates)
+            except DeadlineExceeded as ex:
+                return variant_features, False, ex
+            return variant_features, processed, None
+
+        with ThreadPoolExecutor(max_workers=len(FGCReader.PREPROCESSING_VARIANTS)) as executor:
+            results = list(executor.map(process_variant, FGCReader.PREPROCESSING_VARIANTS))
+
+        processed_features = [variant_features for variant_features, processed, _ex in results if processed]
+        if not processed_features:
+            # Hand the best effort of the default variant over if the deadline was exceeded
+            timeouts = [ex for _variant_features, _processed, ex in results if ex is not None]
+            if timeouts:
+                features.update(results[0][0])
+                raise timeouts[0]
+            return False
+
+        features.update(processed_features[0])
+        features["data"] = vote_data_bits([variant_features["data"] for variant_features in processed_features])
+        logger.debug(f"Voted on the data bits of {len(processed_features)} of {len(results)} preprocessing variants.")
+        return True
+
+    @staticmethod
+    def create_overlay(features, region=None) -> dict:
+        """Creates a compact record of the detected geometry the output image is drawn from (see render_overlay).
+        Region is the part of the output image (x_start, y_start, x_end, y_end) the features were found in, None for the whole image."""
+        orientation_dot = features.get("orientation_dot")
+        return {
+            "region": region,
+            "contours": features.get("contours", ())[1:],
+            "center_coordinates": features["center_coordinates"],
+            "center_circle": features["center_circle"],
+            "orientation_ring": features["orientation_ring"],
+            "orientation_dot": orientation_dot["contour"] if orientation_dot is not None else None,
+            "target_positions": features.get("target_positions", []),
+            "ring_contours": [[element["contour"] for element in ring] for ring in features.get("rings", [])],
+        }
+
+    @staticmethod
+    def decode_data(features, read_result) -> None:
+        """Decodes the data bits of the features into version and text of the read result."""
         try:
             raw_binary_string = ''.join([str(ch) for ch in features["data"]])
             read_result.raw_binary_string = raw_binary_string
             raw_binary_bitarray = bitarray(raw_binary_string)
             str_data = raw_binary_bitarray.to01()
-            print("RAW:        ", str_data)
+            logger.debug("RAW:         %s", str_data)
             str_data = [int(bit) for bit in str_data]
             all_data_decoded = bitarray(hamming_decode(str_data))
-            print("Decoded:    ", all_data_decoded.to01())
+            logger.debug("Decoded:     %s", all_data_decoded.to01())
 
             # Cenvert binary version to int
             read_result.version = int(all_data_decoded[:4].to01(), 2)
@@ -167,18 +659,18 @@ class FGCReader():
             for i in range(0, len(text), 8):
                 int_byte = int(text[i:i+8], 2)
                 output_bytes.append(int_byte.to_bytes(1, byteorder='big'))
-            print("Bytes Text:    ", output_bytes)
+            logger.debug("Bytes Text:     %s", output_bytes)
 
             # Decode text as far as possible
             utf8_text = None
             while utf8_text is None and len(output_bytes) > 0:
                 try:
                     utf8_text = b''.join(output_bytes).decode("utf-8")
-                    print("UTF-8 Text:    ", utf8_text)
+                    logger.debug("UTF-8 Text:     %s", utf8_text)
                 except Exception as e:
-                    print("Could not decode to utf-8.")
-                    print(e)
-                    print(traceback.format_exc())
+                    logger.debug("Could not decode to utf-8.")
+                    logger.debug(e)
+                    logger.debug(traceback.format_exc())
                     read_result.has_error = True
                     output_bytes = output_bytes[:-1]
 
@@ -187,8 +679,6 @@ class FGCReader():
                 utf8_text = utf8_text[:-1]
 
             read_result.text = utf8_text
-            return read_result
         except Exception as ex:
-            print(ex)
-            print(traceback.format_exc())
-            return read_result
+            logger.debug(ex)
+            logger.debug(traceback.format_exc())
@@ -0,0 +1,129 @@
+import os
+import sys
+import json
+import base64
+import binascii
+import argparse
+import signal
+import socket
+import socketserver
+import numpy as np
+from multiprocessing import Pool
+from .fgcreader import FGCReader
+from .fgcclient import FGCClient
+from .fgcbatchreader import FGCBatchReader, read_image_as_dict, create_error_dict
+
+
+# Local server keeping a pool of warm reader worker processes behind a unix or localhost tcp socket.
+# Every request is a line of json ({"path": ...} or {"image": base64 bytes}, optionally with "options" for FGCReader.read_image),
+# every response is a line of json with the fields of the read result (see FGCClient).
+
+class FGCServer():
+
+    @staticmethod
+    def serve(socket_path=None, port=None, processes=None, **read_kwargs) -> None:
+        """Serves reads on the unix socket path or, if a port is given, on that tcp port of the loopback interface until it is interrupted.
+        The server is not authenticated and reads any path it is sent, so it only ever listens locally.
+        Requests of all connections are read by a pool of processes (default: number of cores), which are started and warmed up once.
+        The read_kwargs are the defaults of every read, requests can override them."""
+        with Pool(processes=processes, initializer=FGCServer.init_worker) as pool:
+            if port is not None:
+                server = ThreadingTCPServer((FGCClient.HOST, port), FGCRequestHandler)
+            else:
+                socket_path = socket_path or FGCClient.DEFAULT_SOCKET_PATH
+                if os.path.exists(socket_path):
+                    # A socket left behind by a server that did not shut down cleanly
+                    FGCServer.remove_stale_socket(socket_path)
+                server = ThreadingUnixStreamServer(socket_path, FGCRequestHandler)
+            server.pool = pool
+            server.read_kwargs = read_kwargs
+            print(f"Serving fgc reads on {server.server_address}.", file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+                if port is None:
+                    os.remove(socket_path)
+
+    @staticmethod
+    def remove_stale_socket(socket_path) -> None:
+        """Removes the socket file if no server is listening on it anymore."""
+        test_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            test_socket.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.remove(socket_path)
+            return
+        finally:
+            test_socket.close()
+        raise OSError(f"A server is already listening on {socket_path}.")
+
+    @staticmethod
+    def init_worker() -> None:
+        """Prepares a worker process once and reads an empty image, so OpenCV is initialized before the first request."""
+        # Ctrl-C stops the server, which terminates the workers, they do not have to handle it themselves
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        FGCBatchReader.init_worker()
+        FGCReader.read_image(image=np.zeros((64, 64), dtype=np.uint8))
+
+    @staticmethod
+    def main(argv=None) -> None:
+        """Command line entry point, serves reads until it is interrupted."""
+        parser = argparse.ArgumentParser(description="Serve Fancy Galaxy Code reads with warm worker processes on a local socket.")
+        parser.add_argument("-s", "--socket", default=None, help=f"unix socket to listen on (default: {FGCClient.DEFAULT_SOCKET_PATH})")
+        parser.add_argument("--port", type=int, default=None, help="tcp port to listen on localhost (instead of the unix socket)")
+        parser.add_argument("-p", "--processes", type=int, default=None, help="number of worker processes (default: number of cores)")
+        parser.add_argument("-e", "--engine", default="contour", help="engine reading the data bits (contour, polar or runlength)")
+        args = parser.parse_args(argv)
+        FGCServer.serve(args.socket, args.port, args.processes, engine=args.engine)
+
+
+class FGCRequestHandler(socketserver.StreamRequestHandler):
+    """Answers the requests of one connection one after another."""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("A request has to be a json object.")
+                result = self.server.pool.apply(read_request_in_worker, ((request, self.server.read_kwargs),))
+            except (ValueError, TypeError) as ex:
+                # Broken requests (invalid json, options that are no dict or unknown options) only fail themselves
+                result = create_error_dict(None, ex)
+            self.wfile.write(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class ThreadingUnixStreamServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def read_request_in_worker(task) -> dict:
+    """Reads the image of a single request in a worker process and returns the fields of the read result as dict."""
+    request, read_kwargs = task
+    read_kwargs = dict(read_kwargs, **request.get("options", {}))
+    path = request.get("path")
+    if path is not None:
+        return read_image_as_dict(path, read_kwargs, image_path=path)
+    if "image" not in request:
+        return create_error_dict(None, "A request needs a path or an image.")
+    try:
+        image_file = base64.b64decode(request["image"], validate=True)
+    except (binascii.Error, TypeError) as ex:
+        return create_error_dict(None, ex)
+    return read_image_as_dict(None, read_kwargs, image_file=image_file)
+
+
+if __name__ == "__main__":
+    FGCServer.main()
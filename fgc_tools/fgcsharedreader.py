@@ -0,0 +1,94 @@
+import os
+import threading
+import numpy as np
+from collections import deque
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from .fgcreader import FGCReader
+from .fgcbatchreader import FGCBatchReader
+
+
+# Reader handing frames to worker processes through a ring buffer in shared memory, so frames are never pickled
+
+class FGCSharedMemoryReader():
+
+    def __init__(self, frame_shape, slots=None, processes=None, **read_kwargs):
+        """Starts the worker processes (default: number of cores) and allocates a ring buffer of slots frames (default: twice the number of processes).
+        The frame shape is the shape of the largest frame, e.g. (1080, 1920, 3) for BGR full hd frames.
+        The read_kwargs are passed on to FGCReader.read_image."""
+        self.processes = processes or os.cpu_count() or 1
+        self.slots = slots or self.processes * 2
+        self.slot_size = int(np.prod(frame_shape))
+        self.shared_memory = SharedMemory(create=True, size=self.slot_size * self.slots)
+        self.read_kwargs = read_kwargs
+        self.next_slot = 0
+        # Held while frames are read, the slots are handed out in order to a single stream
+        self.streaming = threading.Lock()
+        self.pool = Pool(processes=self.processes, initializer=init_worker, initargs=(self.shared_memory.name,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Stops the worker processes and frees the ring buffer."""
+        self.pool.close()
+        self.pool.join()
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+    def read_frames(self, frames):
+        """Reads the fgcs of a stream of frames (decoded BGR or gray uint8 images) and yields a read result per frame in order.
+        Every frame is copied into the next slot of the ring buffer once, the workers read it from there without copying.
+        Only as many frames as the ring buffer has slots are taken from frames before the oldest read result is yielded.
+        Only one stream can be read at a time, starting another one raises RuntimeError."""
+        if not self.streaming.acquire(blocking=False):
+            raise RuntimeError("The reader is already reading a stream of frames, use one reader per stream.")
+        pending = deque()
+        try:
+            for frame in frames:
+                if len(pending) >= self.slots:
+                    # The oldest read holds the slot the next frame is put into
+                    yield pending.popleft().get()
+                pending.append(self.pool.apply_async(read_frame_in_worker, ((self.put_frame(frame), self.read_kwargs),)))
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            # Slots must not be overwritten while workers still read them, e.g. when the caller stops iterating early
+            for read in pending:
+                read.wait()
+            self.streaming.release()
+
+    def read_batch(self, frames) -> list:
+        """Reads the fgcs of a batch of frames and returns a read result per frame in order (see read_frames)."""
+        return list(self.read_frames(frames))
+
+    def put_frame(self, frame) -> tuple:
+        """Copies the frame into the next slot of the ring buffer and returns its descriptor (offset, shape)."""
+        frame = np.asarray(frame)
+        if frame.dtype != np.uint8 or frame.size > self.slot_size:
+            raise ValueError(f"Frames have to be uint8 images of at most {self.slot_size} values, got {frame.dtype} of shape {frame.shape}.")
+        offset = self.next_slot * self.slot_size
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shared_memory.buf, offset=offset)[...] = frame
+        self.next_slot = (self.next_slot + 1) % self.slots
+        return (offset, frame.shape)
+
+
+# Ring buffer of the reader, attached once by every worker process
+worker_shared_memory = None
+
+
+def init_worker(shared_memory_name) -> None:
+    """Prepares a worker process once and attaches it to the ring buffer."""
+    global worker_shared_memory
+    FGCBatchReader.init_worker()
+    worker_shared_memory = SharedMemory(name=shared_memory_name)
+
+
+def read_frame_in_worker(task):
+    """Reads a single frame in a worker process from a view of its slot in the ring buffer."""
+    (offset, shape), read_kwargs = task
+    frame = np.ndarray(shape, dtype=np.uint8, buffer=worker_shared_memory.buf, offset=offset)
+    return FGCReader.read_image(image=frame, **read_kwargs)
@@ -1,3 +1,5 @@
 
 class CommonConstants():
-    DEGREES_PER_BIT = [ 20, 15, 12, 10, 9, 8, 8, 6, 6, 6, 5, 5, 5, 5, 4, 4, 4, 4, 4 ]
\ No newline at end of file
+    DEGREES_PER_BIT = [ 20, 15, 12, 10, 9, 8, 8, 6, 6, 6, 5, 5, 5, 5, 4, 4, 4, 4, 4 ]
+    CIRCLE_DISTANCE = 3
+    STROKE_WIDTH = 2
\ No newline at end of file
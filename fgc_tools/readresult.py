@@ -1,3 +1,5 @@
+from .cvfunctions import render_overlay
+
 
 class ReadResult():
     def __init__(self):
@@ -6,5 +8,21 @@ class ReadResult():
         self.has_error = False
         self.read_time = 0
         self.raw_binary_string = ""
-        self.output_img = None
-    
\ No newline at end of file
+        self.found_fgc = False
+        self.timed_out = False
+        self.timeout_stage = None
+        # Geometry detected while reading with overlay and the image it is drawn on
+        self.overlays = []
+        self.overlay_img = None
+        self._output_img = None
+
+    @property
+    def output_img(self):
+        """Image with the detected geometry drawn on it. It is only drawn when it is accessed the first time (None without overlay)."""
+        if self._output_img is None and self.overlay_img is not None:
+            self._output_img = render_overlay(self.overlay_img, self.overlays)
+        return self._output_img
+
+    @output_img.setter
+    def output_img(self, output_img):
+        self._output_img = output_img
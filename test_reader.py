@@ -1,4 +1,5 @@
 from fgc_tools import FGCReader
+import logging
 import matplotlib.pyplot as plt
 from fgc_tools.cvfunctions import *
 from fgc_tools.readresult import ReadResult
@@ -7,6 +8,10 @@ from fgc_tools.readresult import ReadResult
 def main():
     print("FGC Reader started")
 
+    # Show what the reader is doing
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("fgc_tools").setLevel(logging.DEBUG)
+
     test_images = [
         { "img": 'static/test_images/1.jpg', "content": "Level1" },
         { "img": 'static/test_images/2.jpg', "content": "Level2 which is harder" },
@@ -29,7 +34,7 @@ def main():
         print("="*60)
         print("Test image: %s" % test_image["img"])
         print("-"*60)
-        read_result:ReadResult = FGCReader.read_image(test_image["img"])
+        read_result:ReadResult = FGCReader.read_image(test_image["img"], overlay=True)
         show_image("Output of: " + test_image["img"], read_result.output_img)
 
         print("-"*60)